@@ -0,0 +1,132 @@
+"""Shared helpers for the benchmark scripts: server bootstrapping and latency statistics"""
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# Benchmarks never touch the application database
+BENCH_DB_NAME = "ipad_hilfe_bench"
+
+
+class SlowCollection:
+    """Collection proxy that sleeps before each call to simulate network latency"""
+
+    def __init__(self, collection, latency):
+        self._collection = collection
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency)
+            return attr(*args, **kwargs)
+        return call
+
+
+def load_server(mongo_url=None, latency_ms=0.0, corpus_size=0, seed=0, env=None):
+    """Import server.py against mongomock or a real MongoDB, seeded with a synthetic corpus"""
+    os.environ["MONGO_DB_NAME"] = BENCH_DB_NAME
+    os.environ.update(env or {})
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+    else:
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+
+    import server
+    if mongo_url:
+        server.client.drop_database(BENCH_DB_NAME)
+    if corpus_size:
+        from corpus import corpus_documents
+        categories = [category["name"] for category in server.CATEGORIES]
+        server.faq_collection.insert_many(corpus_documents(corpus_size, categories, seed))
+    if not mongo_url and latency_ms:
+        server.faq_collection = SlowCollection(server.faq_collection, latency_ms / 1000)
+        server.preferences_collection = SlowCollection(server.preferences_collection, latency_ms / 1000)
+    return server
+
+
+def serve(port, kwargs):
+    """Child process entry point: run the app under uvicorn"""
+    import uvicorn
+
+    server = load_server(**kwargs)
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(timeout=600, **kwargs):
+    """Serve the app from a separate process so clients don't share its GIL.
+
+    Returns once the search index has been loaded from the database.
+    """
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=serve, args=(port, kwargs), daemon=True)
+    process.start()
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/health").json().get("content") == "database":
+                return process, base_url
+        except httpx.TransportError:
+            pass
+        if not process.is_alive():
+            break
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become ready")
+
+
+def stop_server(process):
+    process.terminate()
+    process.join()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles for one set of request timings"""
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+def run_metadata():
+    """Identify the code and environment a result was produced with"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+    }
@@ -0,0 +1,82 @@
+"""Concurrency benchmark for the iPad-Hilfe API.
+
+Boots the FastAPI app in a local uvicorn server, drives it with many
+parallel HTTP clients and reports p50/p95/p99 latency per endpoint. By default the database is a mongomock
+stand-in with an artificial round-trip delay, so a blocked event loop
+shows up directly as tail latency; pass --mongo-url to run against a
+local mongod instead.
+
+    python benchmarks/concurrency.py --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import run_metadata, start_server, stop_server, summarize
+
+
+async def run(base_url, paths, concurrency, total_requests):
+    import httpx
+
+    latencies = {path: [] for path in paths}
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies[path].append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "overall": summarize(everything, elapsed),
+        "endpoints": {path: summarize(values, elapsed) for path, values in latencies.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="Use a real MongoDB instead of mongomock")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated round-trip latency for mongomock")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    import httpx
+
+    process, base_url = start_server(mongo_url=args.mongo_url, latency_ms=args.latency_ms)
+    try:
+        faq_id = httpx.get(f"{base_url}/api/faq?limit=1").json()[0]["id"]
+        paths = [
+            "/api/categories",
+            "/api/faq",
+            f"/api/faq/{faq_id}",
+            "/api/search?q=wlan",
+            "/api/preferences/bench-user",
+        ]
+        results = asyncio.run(run(base_url, paths, args.concurrency, args.requests))
+    finally:
+        stop_server(process)
+    results["config"] = vars(args)
+    results["metadata"] = run_metadata()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Synthetic German FAQ corpora for benchmarks"""
+import random
+import uuid
+from datetime import datetime
+
+from faq_import import content_hash
+
+VERBS = [
+    "erstelle", "teile", "drucke", "speichere", "öffne", "lösche", "synchronisiere",
+    "finde", "übertrage", "schütze", "aktualisiere", "bearbeite", "exportiere", "sichere",
+]
+OBJECTS = [
+    "Dokumente", "Arbeitsblätter", "Präsentationen", "Fotos", "Videos", "Notizen",
+    "Passwörter", "die Apple-ID", "die WLAN-Verbindung", "den Stundenplan", "Hausaufgaben",
+    "Ordner", "Bildschirmaufnahmen", "Kalendertermine", "E-Mails", "Lernkarten",
+]
+APPS = [
+    "Pages", "Keynote", "GoodNotes", "mebis", "Teams", "Dateien", "Safari", "Fotos",
+    "Notizen", "iMovie", "GarageBand", "Numbers", "Classroom", "OneDrive",
+]
+CONTEXTS = [
+    "für die Schule", "im Unterricht", "zu Hause", "mit meiner Klasse", "für das Referat",
+    "vor der Prüfung", "unterwegs", "im Schulnetz", "mit der Lehrkraft", "über AirDrop",
+]
+STEPS = [
+    "Öffne die App '{app}'",
+    "Tippe oben rechts auf 'Teilen'",
+    "Wähle {object} aus der Liste",
+    "Bestätige mit 'Fertig'",
+    "Gehe zu 'Einstellungen' > '{app}'",
+    "Aktiviere die Option 'Automatisch sichern'",
+    "Prüfe, ob das iPad mit dem Schul-WLAN verbunden ist",
+    "Melde dich mit deiner Schul-Apple-ID an",
+    "Halte das Symbol gedrückt, bis das Menü erscheint",
+    "Ziehe {object} in den gewünschten Ordner",
+    "Starte das iPad neu, falls es nicht klappt",
+    "Frage bei Problemen deine Lehrkraft oder den IT-Support",
+]
+TIPS = [
+    "Tipp: Speichere wichtige Dateien zusätzlich in der Schulcloud.",
+    "Wichtig: Teile niemals dein Passwort mit anderen.",
+    "Hinweis: Große Dateien übertragen sich schneller über WLAN.",
+    "Tipp: Mit Split View arbeitest du mit zwei Apps gleichzeitig.",
+]
+
+CORPUS_NAMESPACE = uuid.UUID("0f3c2b8e-6a51-4d97-8e2f-9b4a7c1d5e60")
+
+
+def generate_faq_items(count, categories, seed=0):
+    """Yield ``count`` reproducible FAQ items"""
+    rng = random.Random(seed)
+    for index in range(count):
+        verb, obj, app, context = rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(APPS), rng.choice(CONTEXTS)
+        steps = rng.sample(STEPS, rng.randint(3, 7))
+        answer = "\n".join(
+            f"{number}. {step.format(app=app, object=obj)}" for number, step in enumerate(steps, 1)
+        )
+        if rng.random() < 0.5:
+            answer += "\n\n**" + rng.choice(TIPS) + "**"
+        yield {
+            "id": str(uuid.uuid5(CORPUS_NAMESPACE, f"{seed}-{index}")),
+            "question": f"Wie {verb} ich {obj} in {app} {context}? (#{index})",
+            "answer": answer,
+            "category": rng.choice(categories),
+        }
+
+
+def corpus_documents(count, categories, seed=0):
+    """Generated items as stored documents, ready for insert_many"""
+    now = datetime.now()
+    return [
+        dict(item, content_hash=content_hash(item), created_at=now, updated_at=now)
+        for item in generate_faq_items(count, categories, seed)
+    ]
+
+
+def search_queries(seed=0, count=200):
+    """Queries typical for students: app names, objects and partially typed words"""
+    rng = random.Random(seed)
+    words = APPS + [obj.split()[-1] for obj in OBJECTS] + ["WLAN", "Apple-ID", "Drucken", "Passwort"]
+    queries = []
+    for _ in range(count):
+        shape = rng.random()
+        if shape < 0.5:
+            queries.append(rng.choice(words))
+        elif shape < 0.8:
+            queries.append(f"{rng.choice(words)} {rng.choice(words)}")
+        else:
+            word = rng.choice(words)
+            queries.append(word[:max(2, len(word) - rng.randint(1, 3))])
+    return queries
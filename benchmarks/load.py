@@ -0,0 +1,127 @@
+"""Load benchmark for the iPad-Hilfe API across corpus sizes.
+
+For each corpus size the app is booted in a uvicorn subprocess against
+mongomock (or a local mongod with --mongo-url), seeded with a synthetic
+German FAQ corpus, and driven by concurrent clients with a mix of
+search, list, category and preference requests. Throughput and
+p50/p95/p99 latency per endpoint are written to a JSON file so releases
+can be compared.
+
+    python benchmarks/load.py --sizes 0,1000,10000,100000 --output bench_output.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from common import run_metadata, start_server, stop_server, summarize
+from corpus import search_queries
+
+
+def preferences_put(user_id, theme):
+    body = {"user_id": user_id, "theme": theme, "favorites": [], "has_seen_intro": True}
+    return "preferences_put", "PUT", f"/api/preferences/{user_id}", body
+
+
+def request_mix(faq_ids, categories, queries, users, seed):
+    """Endless weighted stream of (endpoint label, method, path, json body)"""
+    rng = random.Random(seed)
+    mix = [
+        (30, lambda: ("search", "GET", f"/api/search?q={rng.choice(queries)}", None)),
+        (15, lambda: ("search_bm25", "GET", f"/api/search?mode=bm25&q={rng.choice(queries)}", None)),
+        (5, lambda: ("search_popular", "GET", "/api/search/popular", None)),
+        (10, lambda: ("faq_list", "GET", f"/api/faq?limit=20&category={rng.choice(categories)}", None)),
+        (5, lambda: ("faq_summary", "GET", "/api/faq/summary?limit=50", None)),
+        (10, lambda: ("faq_item", "GET", f"/api/faq/{rng.choice(faq_ids)}", None)),
+        (2, lambda: ("bundle", "GET", "/api/bundle", None)),
+        (10, lambda: ("categories", "GET", "/api/categories", None)),
+        (10, lambda: ("preferences_get", "GET", f"/api/preferences/{rng.choice(users)}", None)),
+        (5, lambda: preferences_put(rng.choice(users), rng.choice(["light", "dark"]))),
+        (5, lambda: ("favorites_add", "POST", f"/api/preferences/{rng.choice(users)}/favorites/{rng.choice(faq_ids)}", None)),
+    ]
+    weights = [weight for weight, _ in mix]
+    makers = [maker for _, maker in mix]
+    while True:
+        yield rng.choices(makers, weights)[0]()
+
+
+async def drive(base_url, requests, concurrency, total_requests):
+    import httpx
+
+    latencies = {}
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for _ in range(total_requests // concurrency):
+                label, method, path, body = next(requests)
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies.setdefault(label, []).append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "overall": dict(summarize(everything, elapsed), errors=errors),
+        "endpoints": {label: summarize(values, elapsed) for label, values in sorted(latencies.items())},
+    }
+
+
+def bench_size(args, size):
+    import httpx
+
+    env = {"CONTENT_CACHE_MAX_ENTRIES": "0"} if args.no_response_cache else {}
+    started = time.perf_counter()
+    process, base_url = start_server(
+        mongo_url=args.mongo_url, latency_ms=args.latency_ms, corpus_size=size, seed=args.seed, env=env,
+    )
+    boot_seconds = time.perf_counter() - started
+    try:
+        categories = [category["name"] for category in httpx.get(f"{base_url}/api/categories").json()]
+        faq_ids = [item["id"] for item in httpx.get(f"{base_url}/api/faq?limit=1000&fields=id").json()]
+        users = [f"bench-user-{n}" for n in range(args.users)]
+        requests = request_mix(faq_ids, categories, search_queries(args.seed), users, args.seed)
+
+        # Warm up connections and caches before measuring
+        asyncio.run(drive(base_url, requests, args.concurrency, args.concurrency * 4))
+        result = asyncio.run(drive(base_url, requests, args.concurrency, args.requests))
+    finally:
+        stop_server(process)
+    result["corpus_items"] = size
+    result["boot_seconds"] = round(boot_seconds, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="0,1000,10000", help="Comma-separated synthetic corpus sizes (added to the built-in items)")
+    parser.add_argument("--mongo-url", help="Use a local MongoDB instead of mongomock")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated round-trip latency for mongomock")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3200)
+    parser.add_argument("--users", type=int, default=200, help="Distinct user ids for preference requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-response-cache", action="store_true", help="Disable the FAQ response cache")
+    parser.add_argument("--output", default="bench_output.json", help="JSON result file")
+    args = parser.parse_args()
+
+    results = {"metadata": run_metadata(), "config": vars(args), "sizes": {}}
+    for size in (int(value) for value in args.sizes.split(",")):
+        print(f"Benchmarking corpus of {size} synthetic items...")
+        results["sizes"][str(size)] = bench_size(args, size)
+        print(json.dumps(results["sizes"][str(size)]["overall"]))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
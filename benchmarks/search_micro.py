@@ -0,0 +1,116 @@
+"""Search micro-benchmark: index build time and per-query cost by corpus size.
+
+Compares the in-memory index (default and BM25 ranking), the same index
+loaded from a memory-mapped snapshot, and the original full-scan scorer
+on the same synthetic corpus and queries, without any HTTP or database
+overhead.
+
+    python benchmarks/search_micro.py --sizes 1000,10000,100000 --output search_micro.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import orjson
+
+from common import percentile, run_metadata
+from corpus import generate_faq_items, search_queries
+from search_index import FAQSearchIndex
+
+CATEGORIES = ["Grundlagen", "Apps", "Netzwerk", "Sicherheit", "Unterricht", "Probleme"]
+
+
+def full_scan_search(items, query, limit):
+    """The original scorer: substring tests against every item"""
+    query = query.strip().lower()
+    scored = []
+    for item in items:
+        score = 0
+        question = item["question"].lower()
+        answer = item["answer"].lower()
+        if query in question:
+            score += 10
+        if query in answer:
+            score += 5
+        for word in query.split():
+            if word in question:
+                score += 3
+            if word in answer:
+                score += 1
+        if score > 0:
+            scored.append((item, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return [item for item, _ in scored[:limit]]
+
+
+def time_queries(search, queries, repeat):
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            timings.append(time.perf_counter() - start)
+    return {
+        "queries": len(timings),
+        "p50_us": round(percentile(timings, 50) * 1e6, 1),
+        "p99_us": round(percentile(timings, 99) * 1e6, 1),
+        "mean_us": round(sum(timings) / len(timings) * 1e6, 1),
+    }
+
+
+def bench_size(size, queries, limit, repeat, seed, full_scan_max):
+    items = list(generate_faq_items(size, CATEGORIES, seed))
+    index = FAQSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(items)
+    result = {"build_seconds": round(time.perf_counter() - start, 3)}
+
+    result["default"] = time_queries(lambda q: index.search(q, limit), queries, repeat)
+    result["bm25"] = time_queries(lambda q: index.search_bm25(q, limit), queries, repeat)
+
+    # The same index served from a memory-mapped snapshot, as in the multi-worker mode
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "faq.snapshot")
+        start = time.perf_counter()
+        index.save_snapshot(path, orjson.dumps)
+        result["snapshot_write_seconds"] = round(time.perf_counter() - start, 3)
+        result["snapshot_bytes"] = os.path.getsize(path)
+        mapped = FAQSearchIndex()
+        start = time.perf_counter()
+        mapped.load_snapshot(path)
+        result["snapshot_load_seconds"] = round(time.perf_counter() - start, 6)
+        result["snapshot_default"] = time_queries(lambda q: mapped.search(q, limit), queries, repeat)
+        result["snapshot_bm25"] = time_queries(lambda q: mapped.search_bm25(q, limit), queries, repeat)
+        del mapped
+    if size <= full_scan_max:
+        result["full_scan"] = time_queries(lambda q: full_scan_search(items, q, limit), queries, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated corpus sizes")
+    parser.add_argument("--queries", type=int, default=200, help="Distinct queries per size")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the queries for the index timings")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-scan-max", type=int, default=10000, help="Skip the full-scan scorer above this size")
+    parser.add_argument("--output", default="search_micro.json", help="JSON result file")
+    args = parser.parse_args()
+
+    queries = search_queries(args.seed, args.queries)
+    results = {"metadata": run_metadata(), "config": vars(args), "sizes": {}}
+    for size in (int(value) for value in args.sizes.split(",")):
+        result = bench_size(size, queries, args.limit, args.repeat, args.seed, args.full_scan_max)
+        results["sizes"][str(size)] = result
+        print(f"{size} items: {json.dumps(result)}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Serialization benchmark for FAQ list responses.
+
+Compares the bytes and CPU time per request of the full /api/faq path
+(Pydantic validation, jsonable_encoder, json.dumps as FastAPI's
+response_model does it) against the /api/faq/summary path (answer
+snippets encoded directly with orjson).
+
+    python benchmarks/serialization.py --items 100 --iterations 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder
+
+import server
+
+
+def make_items(count):
+    """Copies of the built-in FAQ content with unique ids and timestamps"""
+    items = []
+    while len(items) < count:
+        for source in server.FAQ_DATA[:count - len(items)]:
+            item = {key: value for key, value in source.items() if key != "_id"}
+            item["id"] = str(uuid.uuid4())
+            item["created_at"] = item["updated_at"] = datetime.now()
+            items.append(item)
+    return items
+
+
+def full_response(items):
+    validated = [server.FAQItem(**item) for item in items]
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def summary_response(items):
+    return server.encode_json([
+        {
+            "id": item["id"],
+            "question": item["question"],
+            "category": item["category"],
+            "snippet": server.answer_snippet(item["answer"]),
+        }
+        for item in items
+    ])
+
+
+def measure(func, items, iterations):
+    body = func(items)
+    start = time.process_time()
+    for _ in range(iterations):
+        func(items)
+    cpu = time.process_time() - start
+    return {
+        "bytes_per_request": len(body),
+        "cpu_us_per_request": round(cpu / iterations * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100, help="Items per response")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    full = measure(full_response, items, args.iterations)
+    summary = measure(summary_response, items, args.iterations)
+    results = {
+        "config": vars(args),
+        "full": full,
+        "summary": summary,
+        "bytes_ratio": round(summary["bytes_per_request"] / full["bytes_per_request"], 3),
+        "cpu_ratio": round(summary["cpu_us_per_request"] / full["cpu_us_per_request"], 3),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
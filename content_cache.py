@@ -0,0 +1,232 @@
+"""Process-local caches for FAQ responses and user documents"""
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+try:
+    import brotli
+except ImportError:  # optional: compressed responses fall back to gzip
+    brotli = None
+
+# Preferred content codings, best first
+COMPRESSIONS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def encode_json(data) -> bytes:
+    """Serialize data to compact UTF-8 JSON; datetimes become ISO 8601 strings"""
+    return orjson.dumps(data)
+
+
+def make_etag(body: bytes, prefix: str = "") -> str:
+    """Strong ETag derived from the response body"""
+    return '"' + prefix + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime for the Last-Modified header"""
+    if value.tzinfo is None:
+        value = value.astimezone(timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """Check an If-Modified-Since header against the content timestamp"""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.astimezone(timezone.utc)
+    # HTTP dates have second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    """Best supported content coding the client accepts, or identity"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in COMPRESSIONS:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Encode a body for the given content coding; the output is deterministic"""
+    if encoding == "br":
+        return brotli.compress(body)
+    if encoding == "gzip":
+        # A fixed mtime keeps the bytes, and so the ETag, identical across processes
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    return body
+
+
+class ContentCache:
+    """LRU of encoded response bodies tied to a corpus version.
+
+    Every change to the FAQ corpus calls ``bump()``, which advances the
+    version and empties the cache. ETags embed the version, so a client
+    holding a tag from an older corpus never gets a false 304.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.version = 0
+        self.last_modified: Optional[datetime] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, str, Dict[str, str]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bump(self, last_modified: Optional[datetime] = None):
+        """Start a new corpus version and drop every cached body.
+
+        ``last_modified`` is when the version changed, by default now. It
+        always moves to a later second than the previous version's, so
+        If-Modified-Since from any earlier version gets the new content.
+        """
+        self.version += 1
+        last_modified = (last_modified or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        if self.last_modified is not None:
+            # HTTP dates have second resolution
+            last_modified = max(last_modified, self.last_modified.replace(microsecond=0) + timedelta(seconds=1))
+        self.last_modified = last_modified
+        self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str, Dict[str, str]]]:
+        """Return ``(body, etag, headers)`` for a cached response, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        body: bytes,
+        version: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+    ) -> Tuple[bytes, str, Dict[str, str]]:
+        """Store an encoded body and return it with its ETag and extra headers.
+
+        ``version`` is the corpus version the body was computed from; if the
+        corpus changed in the meantime the body is returned but not cached.
+        ``etag`` replaces the default, version-scoped ETag.
+        """
+        if version is None:
+            version = self.version
+        entry = (body, etag or make_etag(body, prefix=f"v{version}-"), headers or {})
+        if version != self.version:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+class LRUCache:
+    """Bounded LRU mapping with a per-entry TTL and hit/miss counters.
+
+    Values loaded from the database go through ``load()`` with the
+    ``epoch`` read before the query. Writes to keys that are not cached
+    advance the epoch, so a load that raced with a write is not stored
+    and cannot shadow the newer data.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, key: Hashable, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self, key: Hashable, value, epoch: int):
+        """Cache a value read from the database unless a write happened since ``epoch``"""
+        if epoch == self.epoch:
+            self._store(key, value)
+
+    def write(self, key: Hashable, value):
+        """Write-through of a value whose new state is fully known"""
+        self.epoch += 1
+        self._store(key, value)
+
+    def advance_epoch(self):
+        """Keep loads that started before now from being cached, e.g. once a buffered write has landed"""
+        self.epoch += 1
+
+    def modify(self, key: Hashable, func: Callable[[Any], Any]):
+        """Write-through of a change relative to the cached value"""
+        if key in self:
+            self._store(key, func(self._entries[key][1]))
+        else:
+            self.epoch += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,146 @@
+"""Incremental FAQ content sync and bulk import.
+
+Items are compared by a hash of their content and only new or changed
+items are written, as upserts keyed on ``id`` in one ``bulk_write`` per
+batch. Running a sync twice is a no-op.
+
+Command line usage for loading large school-specific FAQ sets:
+
+    python faq_import.py schule.jsonl
+    python faq_import.py faq.json --mongo-url mongodb://db:27017 --batch-size 2000
+
+Running servers notice the new content within CONTENT_REFRESH_INTERVAL
+seconds and rebuild their search index.
+"""
+import argparse
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Tuple
+
+from pymongo import UpdateOne
+
+CONTENT_FIELDS = ("question", "answer", "category")
+# Items without an id get a stable one derived from their content, so re-imports stay idempotent
+FAQ_ID_NAMESPACE = uuid.UUID("5b1f9d6e-3c7a-4f0e-9a53-2d8c4e6f1a70")
+DEFAULT_BATCH_SIZE = 1000
+
+
+def content_hash(item: dict) -> str:
+    """Hash of the fields that make up an item's content"""
+    payload = json.dumps([item[field] for field in CONTENT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_item(item: dict) -> dict:
+    """Validate an incoming item and reduce it to id and content fields"""
+    missing = [field for field in CONTENT_FIELDS if not isinstance(item.get(field), str)]
+    if missing:
+        raise ValueError(f"FAQ item is missing fields: {', '.join(missing)}")
+    faq_id = item.get("id") or str(uuid.uuid5(FAQ_ID_NAMESPACE, item["category"] + "\n" + item["question"]))
+    return {"id": faq_id, **{field: item[field] for field in CONTENT_FIELDS}}
+
+
+def _sync_batch(collection, batch: list) -> Tuple[int, int]:
+    stored = {
+        doc["id"]: doc
+        for doc in collection.find(
+            {"id": {"$in": [item["id"] for item in batch]}},
+            {"_id": 0, "id": 1, "content_hash": 1, **{field: 1 for field in CONTENT_FIELDS}},
+        )
+    }
+    now = datetime.now()
+    operations = []
+    for item in batch:
+        digest = content_hash(item)
+        existing = stored.get(item["id"])
+        if existing is not None:
+            if existing.get("content_hash") == digest:
+                continue
+            if "content_hash" not in existing and all(field in existing for field in CONTENT_FIELDS) \
+                    and content_hash(existing) == digest:
+                # Seeded before hashes existed: record the hash without touching updated_at
+                operations.append(UpdateOne({"id": item["id"]}, {"$set": {"content_hash": digest}}))
+                continue
+        operations.append(UpdateOne(
+            {"id": item["id"]},
+            {
+                "$set": {**item, "content_hash": digest, "updated_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        ))
+
+    if not operations:
+        return 0, len(batch)
+    # Ordered, so new items are inserted (and listed) in file order
+    result = collection.bulk_write(operations, ordered=True)
+    changed = result.upserted_count + result.modified_count
+    return changed, len(batch) - changed
+
+
+def sync_faq_items(collection, items: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Write new and changed FAQ items; returns counts of changed and unchanged items"""
+    changed = unchanged = 0
+    iterator = (normalize_item(item) for item in items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        batch_changed, batch_unchanged = _sync_batch(collection, batch)
+        changed += batch_changed
+        unchanged += batch_unchanged
+    return {"changed": changed, "unchanged": unchanged}
+
+
+def iter_faq_file(path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Stream FAQ items from a JSON Lines file or a JSON array without loading it whole"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            # JSON Lines
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import FAQ items from a JSON or JSON Lines file")
+    parser.add_argument("path", help="JSON array or JSON Lines file of FAQ items")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default=os.environ.get("MONGO_DB_NAME", "ipad_hilfe"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+
+    collection = MongoClient(args.mongo_url)[args.database].faq_items
+    counts = sync_faq_items(collection, iter_faq_file(args.path), batch_size=args.batch_size)
+    print(f"Imported FAQ items: {counts['changed']} changed, {counts['unchanged']} unchanged")
+
+
+if __name__ == "__main__":
+    main()
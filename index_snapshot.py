@@ -0,0 +1,277 @@
+"""Read-only, memory-mapped snapshot files for the FAQ search index.
+
+A snapshot stores flat arrays and string tables back to back in one file,
+followed by a JSON header that locates each section. Readers map the file
+with ``mmap`` and access the sections through ``memoryview`` casts, so
+every process that opens the same file shares one copy of its pages.
+
+Files are written under a temporary name in the target directory and
+moved into place with ``os.replace``: readers see either the previous or
+the new snapshot, never a partial one.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Union
+
+import orjson
+
+MAGIC = b"FAQSNAP4"
+# Magic, then offset and length of the JSON header
+PREFIX = struct.Struct("<8sQQ")
+ALIGNMENT = 8
+
+
+class SnapshotWriter:
+    """Collects sections and writes them as one snapshot file"""
+
+    def __init__(self):
+        self._sections: Dict[str, tuple] = {}
+
+    def add_array(self, name: str, values: array):
+        self._sections[name] = (values.typecode, values.tobytes())
+
+    def add_strings(self, name: str, values: Iterable[Union[str, bytes]]):
+        """A table of strings (or raw byte strings), addressed by position"""
+        offsets = array("Q", [0])
+        chunks = []
+        for value in values:
+            data = value.encode("utf-8") if isinstance(value, str) else value
+            chunks.append(data)
+            offsets.append(offsets[-1] + len(data))
+        self._sections[name + ".data"] = ("B", b"".join(chunks))
+        self.add_array(name + ".offsets", offsets)
+
+    def add_map(self, name: str, mapping: Dict[str, int]):
+        """A string to integer mapping, stored as sorted keys"""
+        keys = sorted(mapping)
+        self.add_strings(name + ".keys", keys)
+        self.add_array(name + ".values", array("I", (mapping[key] for key in keys)))
+
+    def add_postings(self, name: str, postings: Dict[str, Dict[int, int]]):
+        """Posting lists ``{term: {slot: frequency}}``, stored as sorted terms and flat arrays sorted by slot"""
+        keys = sorted(postings)
+        offsets = array("Q", [0])
+        slots = array("I")
+        frequencies = array("I")
+        for key in keys:
+            for slot, frequency in sorted(postings[key].items()):
+                slots.append(slot)
+                frequencies.append(frequency)
+            offsets.append(len(slots))
+        self.add_strings(name + ".keys", keys)
+        self.add_array(name + ".offsets", offsets)
+        self.add_array(name + ".slots", slots)
+        self.add_array(name + ".frequencies", frequencies)
+
+    def write(self, path: str, meta: dict):
+        """Atomically replace ``path`` with the collected sections"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".faq-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(PREFIX.pack(MAGIC, 0, 0))
+                sections = {}
+                for name, (typecode, data) in self._sections.items():
+                    f.write(b"\0" * (-f.tell() % ALIGNMENT))
+                    sections[name] = [f.tell(), len(data), typecode]
+                    f.write(data)
+                header = orjson.dumps({"meta": meta, "sections": sections})
+                header_offset = f.tell()
+                f.write(header)
+                f.seek(0)
+                f.write(PREFIX.pack(MAGIC, header_offset, len(header)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class Snapshot:
+    """A snapshot file mapped read-only into memory.
+
+    The mapping stays open as long as any view obtained from it is
+    referenced, so a replaced snapshot is released once its last reader
+    has moved on.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_offset, header_length = PREFIX.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an FAQ snapshot file")
+        self._view = memoryview(self._map)
+        header = orjson.loads(self._view[header_offset:header_offset + header_length])
+        self.meta: dict = header["meta"]
+        self._sections: Dict[str, list] = header["sections"]
+
+    def array(self, name: str) -> memoryview:
+        offset, length, typecode = self._sections[name]
+        return self._view[offset:offset + length].cast(typecode)
+
+    def strings(self, name: str) -> "StringTable":
+        return StringTable(self.array(name + ".data"), self.array(name + ".offsets"))
+
+    def json(self, name: str) -> "JSONTable":
+        return JSONTable(self.array(name + ".data"), self.array(name + ".offsets"))
+
+    def map(self, name: str) -> "SortedMap":
+        return SortedMap(self.strings(name + ".keys"), self.array(name + ".values"))
+
+    def postings(self, name: str) -> "PostingsMap":
+        return PostingsMap(
+            self.strings(name + ".keys"),
+            self.array(name + ".offsets"),
+            self.array(name + ".slots"),
+            self.array(name + ".frequencies"),
+        )
+
+
+def read_meta(path: str) -> dict:
+    """Metadata of a snapshot file"""
+    return Snapshot(path).meta
+
+
+class StringTable(Sequence):
+    """Sequence of strings decoded on access from a blob and an offsets array"""
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _slice(self, index: int) -> memoryview:
+        if index < 0:
+            raise IndexError(index)
+        # Indexing past the end of the offsets raises IndexError as well
+        return self._data[self._offsets[index]:self._offsets[index + 1]]
+
+    def raw(self, index: int) -> bytes:
+        return self._slice(index).tobytes()
+
+    def __getitem__(self, index: int) -> str:
+        # Same as _slice, inlined: search decodes two strings per candidate
+        if index < 0:
+            raise IndexError(index)
+        offsets = self._offsets
+        return str(self._data[offsets[index]:offsets[index + 1]], "utf-8")
+
+
+class JSONTable(StringTable):
+    """Sequence of JSON documents"""
+
+    def __getitem__(self, index: int):
+        data = self._slice(index)
+        return orjson.loads(data) if data else None
+
+
+class SortedMap(Mapping):
+    """Read-only string to integer mapping over sorted keys"""
+
+    def __init__(self, keys: StringTable, values: memoryview):
+        self._keys = keys
+        self._values = values
+
+    def _position(self, key: str) -> int:
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return position
+        raise KeyError(key)
+
+    def __getitem__(self, key: str) -> int:
+        return self._values[self._position(key)]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def values(self):
+        return self._values.tolist()
+
+
+class PostingList(Mapping):
+    """Read-only ``{slot: frequency}`` view of one term's slice of the posting arrays"""
+
+    __slots__ = ("_slots", "_frequencies")
+
+    def __init__(self, slots: memoryview, frequencies: memoryview):
+        self._slots = slots
+        self._frequencies = frequencies
+
+    def __getitem__(self, slot: int) -> int:
+        position = bisect_left(self._slots, slot)
+        if position < len(self._slots) and self._slots[position] == slot:
+            return self._frequencies[position]
+        raise KeyError(slot)
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def items(self):
+        # Pairs straight from the arrays instead of an ItemsView looking up each slot
+        return zip(self._slots, self._frequencies)
+
+
+class PostingLists(Sequence):
+    """Posting lists addressed by term number, the position of the term in the sorted keys"""
+
+    def __init__(self, offsets: memoryview, slots: memoryview, frequencies: memoryview):
+        self._offsets = offsets
+        self._slots = slots
+        self._frequencies = frequencies
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, number: int) -> PostingList:
+        if not 0 <= number < len(self._offsets) - 1:
+            raise IndexError(number)
+        start, end = self._offsets[number], self._offsets[number + 1]
+        return PostingList(self._slots[start:end], self._frequencies[start:end])
+
+
+class PostingsMap(SortedMap):
+    """Read-only ``{term: {slot: frequency}}`` over flat posting arrays"""
+
+    def __init__(self, keys: StringTable, offsets: memoryview, slots: memoryview, frequencies: memoryview):
+        super().__init__(keys, offsets)
+        self.lists = PostingLists(offsets, slots, frequencies)
+
+    def __getitem__(self, key: str) -> PostingList:
+        return self.lists[self._position(key)]
+
+    def values(self):
+        return list(self.lists)
+
+
+class SuffixTable(Sequence):
+    """Sorted ``(suffix, term number)`` pairs stored as term numbers and start offsets"""
+
+    def __init__(self, terms: StringTable, term_numbers: memoryview, starts: memoryview):
+        self._terms = terms
+        self._term_numbers = term_numbers
+        self._starts = starts
+
+    def __len__(self) -> int:
+        return len(self._term_numbers)
+
+    def __getitem__(self, index: int) -> tuple:
+        if not 0 <= index < len(self._term_numbers):
+            raise IndexError(index)
+        number = self._term_numbers[index]
+        return self._terms[number][self._starts[index]:], number
@@ -0,0 +1,171 @@
+"""Prometheus metrics and per-request stage timing"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+
+# Set by the multi-worker entry point before the workers start. Every worker
+# then records its metrics to files in this directory, and /metrics reports
+# the sum over all workers, whichever one answers the scrape.
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, method and status",
+    ["route", "method", "status"],
+)
+MONGO_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command duration by collection and operation",
+    ["collection", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+MONGO_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Failed MongoDB commands by collection and operation",
+    ["collection", "operation"],
+)
+SEARCH_CANDIDATES = Histogram(
+    "search_candidates",
+    "Documents scored per search request",
+    ["mode"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 50000, 100000),
+)
+SEARCH_SCORING = Histogram(
+    "search_scoring_seconds",
+    "Time spent scoring a search request",
+    ["mode"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+# Multiprocess counterpart of the cache_lookups family of CacheStatsCollector,
+# which only sees the caches of its own process
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+    registry=None,
+)
+
+# Stage durations of the current request, reported in the Server-Timing header
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def start_request_timing() -> Dict[str, float]:
+    """Begin collecting stage timings for the current request"""
+    timings: Dict[str, float] = {}
+    _stage_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float):
+    """Add time spent in ``stage`` to the current request"""
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block of code as a Server-Timing stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording call counts and durations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[tuple, tuple] = {}
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.database_name
+        with self._lock:
+            self._inflight[self._key(event)] = (collection, event.command_name)
+
+    def _finish(self, event) -> Optional[tuple]:
+        with self._lock:
+            return self._inflight.pop(self._key(event), None)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        if labels is not None:
+            MONGO_DURATION.labels(*labels).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels is not None:
+            MONGO_DURATION.labels(*labels).observe(event.duration_micros / 1e6)
+            MONGO_FAILURES.labels(*labels).inc()
+
+
+class CacheStatsCollector:
+    """Exposes hit/miss counters of the in-process caches.
+
+    In multiprocess mode the counts reach /metrics through ``publish()``
+    instead, summed over all workers; the hit ratio is then left to the
+    query, as hits over all lookups.
+    """
+
+    def __init__(self):
+        self._caches = {}
+        self._published: Dict[tuple, int] = {}
+
+    def register(self, name: str, stats: Callable[[], Tuple[int, int]]):
+        """Track a cache through a function returning ``(hits, misses)``"""
+        self._caches[name] = stats
+
+    def collect(self):
+        lookups = CounterMetricFamily("cache_lookups", "Cache lookups by cache and result", labels=["cache", "result"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hit ratio since startup", labels=["cache"])
+        for name, stats in self._caches.items():
+            hits, misses = stats()
+            lookups.add_metric([name, "hit"], hits)
+            lookups.add_metric([name, "miss"], misses)
+            ratio.add_metric([name], hits / (hits + misses) if hits + misses else 0.0)
+        yield lookups
+        yield ratio
+
+    def publish(self):
+        """Add the lookups since the last call to the shared CACHE_LOOKUPS counter"""
+        for name, stats in self._caches.items():
+            for result, count in zip(("hit", "miss"), stats()):
+                delta = count - self._published.get((name, result), 0)
+                if delta > 0:
+                    CACHE_LOOKUPS.labels(name, result).inc(delta)
+                self._published[(name, result)] = count
+
+
+cache_stats = CacheStatsCollector()
+REGISTRY.register(cache_stats)
+
+
+def render_metrics() -> tuple:
+    """Current metrics in the Prometheus text format, with their content type"""
+    if MULTIPROCESS_DIR:
+        cache_stats.publish()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, MULTIPROCESS_DIR)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
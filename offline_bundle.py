@@ -0,0 +1,83 @@
+"""Offline bundles: the whole FAQ corpus in one response for precaching on the client.
+
+A bundle carries all items, the categories with their counts and a
+compact search index, so the web app can answer navigation and search
+without the network. Its ``version`` is the latest ``updated_at`` of the
+corpus in milliseconds. A client that already holds a bundle asks for
+``?since=<version>`` and receives a delta: only the items changed after
+that version, plus the current id list (to drop removed items) and the
+current index.
+
+Full bundle::
+
+    {"format": 1, "version": ..., "full": true, "categories": [...],
+     "folding": {...}, "items": [...], "index": {"term": [0, 4, ...]}}
+
+Delta bundle: ``"full": false``, ``"since"``, the changed ``"items"``
+and ``"ids"`` of every current item. Index positions refer to ``items``
+in a full bundle and to ``ids`` in a delta.
+"""
+from bisect import bisect_right
+from calendar import timegm
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from search_index import FOLDING, tokenize
+
+BUNDLE_FORMAT = 1
+
+
+def timestamp_ms(value: Optional[datetime]) -> int:
+    """Milliseconds since the epoch; naive datetimes are UTC, as stored by MongoDB"""
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        return timegm(value.timetuple()) * 1000 + value.microsecond // 1000
+    return int(value.timestamp() * 1000)
+
+
+def update_timestamps(items: List[dict]) -> List[int]:
+    """Distinct item update times in ascending order; the last one is the bundle version"""
+    return sorted({timestamp_ms(item.get("updated_at")) for item in items})
+
+
+def delta_base(timestamps: List[int], since: int) -> int:
+    """Version a delta for ``since`` is computed from, or 0 for a full bundle.
+
+    Every ``since`` between two update times yields the same delta, so it
+    is rounded down to the update time before it. Versions newer than the
+    corpus, e.g. after a restore from backup, get a full bundle.
+    """
+    if since <= 0 or not timestamps or since > timestamps[-1]:
+        return 0
+    position = bisect_right(timestamps, since)
+    return timestamps[position - 1] if position else 0
+
+
+def client_index(items: List[dict]) -> Dict[str, List[int]]:
+    """Normalized term -> positions of the items whose question or answer contains it"""
+    index: Dict[str, List[int]] = {}
+    for position, item in enumerate(items):
+        for term in set(tokenize(item["question"]) + tokenize(item["answer"])):
+            index.setdefault(term, []).append(position)
+    return dict(sorted(index.items()))
+
+
+def build_bundle(items: List[dict], categories: List[dict], since: int = 0) -> dict:
+    """Full bundle of ``items``, or the delta against version ``since`` (see ``delta_base``)"""
+    timestamps = update_timestamps(items)
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "version": timestamps[-1] if timestamps else 0,
+        "full": since == 0,
+        "categories": categories,
+        "folding": FOLDING,
+    }
+    if since == 0:
+        bundle["items"] = items
+    else:
+        bundle["since"] = since
+        bundle["items"] = [item for item in items if timestamp_ms(item.get("updated_at")) > since]
+        bundle["ids"] = [item["id"] for item in items]
+    bundle["index"] = client_index(items)
+    return bundle
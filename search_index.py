@@ -0,0 +1,420 @@
+"""In-memory inverted index for the FAQ search endpoint"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from index_snapshot import Snapshot, SnapshotWriter, SuffixTable
+
+# German-aware normalization: fold umlauts and ß so "Schlüssel" and "Schluessel" share terms
+FOLDING = {"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"}
+UMLAUT_MAP = str.maketrans(FOLDING)
+TOKEN_RE = re.compile(r"[^\W_]+")
+# BM25 terms fold umlauts to the base vowel instead, as CISTEM does, so "Passwörter" stems like "Passwort"
+BASE_VOWEL_MAP = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+# CISTEM protects doubled letters from suffix stripping with a placeholder
+DOUBLED_RE = re.compile(r"(.)\1")
+PROTECTED_RE = re.compile(r"(.)\*")
+
+# Scoring weights (unchanged from the original full-scan scorer)
+PHRASE_IN_QUESTION = 10
+PHRASE_IN_ANSWER = 5
+WORD_IN_QUESTION = 3
+WORD_IN_ANSWER = 1
+
+# BM25 parameters; question terms count double so title hits outrank body hits
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_QUESTION_BOOST = 2
+# Upper bound on the number of vocabulary terms a typed prefix expands to
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def normalize(text: str) -> str:
+    """Lower-case text and fold German umlauts"""
+    return text.lower().translate(UMLAUT_MAP)
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query: normalized, with whitespace collapsed"""
+    return " ".join(normalize(query).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized alphanumeric terms"""
+    return TOKEN_RE.findall(normalize(text))
+
+
+def bm25_terms(text: str) -> List[str]:
+    """Split text into lower-cased terms with umlauts folded to the base vowel, ready for ``stem``"""
+    return TOKEN_RE.findall(text.lower().translate(BASE_VOWEL_MAP))
+
+
+def stem(term: str) -> str:
+    """Light German suffix stripping for ``bm25_terms``.
+
+    A reduced CISTEM variant: "drucker", "drucken" and "druck" all map to
+    "druck", and plurals such as "ids" map to "id". Doubled letters and the
+    "sch", "ei" and "ie" clusters are protected while stripping, so
+    "wissen" becomes "wiss" rather than "wi" and "klasse" becomes "klass".
+    """
+    if len(term) == 3 and term[-1] == "s":
+        return term[:-1]
+    term = term.replace("sch", "$").replace("ei", "%").replace("ie", "&")
+    term = DOUBLED_RE.sub(r"\1*", term)
+    while len(term) > 3:
+        if len(term) > 5 and term[-2:] in ("em", "er", "nd"):
+            term = term[:-2]
+        elif term[-1] in "ens":
+            term = term[:-1]
+        else:
+            break
+    term = PROTECTED_RE.sub(r"\1\1", term)
+    return term.replace("$", "sch").replace("%", "ei").replace("&", "ie")
+
+
+class FAQSearchIndex:
+    """Inverted index over FAQ questions and answers.
+
+    Posting lists map each normalized term to ``{slot: term frequency}``.
+    Query words are resolved to candidate documents through a sorted array
+    of term suffixes, so substring matches ("wlan" in "Heim-WLAN") are
+    found without touching documents that cannot match. Candidates are then
+    scored with the original substring weights on lower-cased text, which
+    ranks them exactly like the original full scan.
+
+    A second set of postings over stemmed terms backs the optional BM25
+    ranking, with a sorted vocabulary array for prefix completion.
+
+    ``save_snapshot()`` writes all of these structures to a file that
+    other processes open with ``load_snapshot()``; a loaded index searches
+    the memory-mapped arrays directly until the next ``rebuild()``.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._snapshot: Optional[Snapshot] = None
+        self._docs: List[dict] = []
+        # Lower-cased question and answer, the texts the default scorer matches against
+        self._question_text: List[str] = []
+        self._answer_text: List[str] = []
+        self._slot_by_id: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # Sorted (suffix, term number) pairs, numbering the terms of _terms
+        self._suffixes: List[tuple] = []
+        # BM25 structures: stemmed postings with field-boosted frequencies
+        self._stem_postings: Dict[str, Dict[int, int]] = {}
+        self._doc_lengths: List[int] = []
+        self._total_length = 0
+        # Sorted vocabularies for substring candidates and BM25 prefix completion
+        self._terms: List[str] = []
+        # Postings of each term of _terms, by term number
+        self._term_postings: List[Dict[int, int]] = []
+        self._bm25_terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    def items(self) -> List[dict]:
+        """All indexed FAQ items in index order"""
+        return list(self._docs)
+
+    def get(self, faq_id: str) -> Optional[dict]:
+        """Look up an indexed FAQ item by id"""
+        slot = self._slot_by_id.get(faq_id)
+        return None if slot is None else self._docs[slot]
+
+    def rebuild(self, items: Iterable[dict]):
+        """Replace the index contents with the given FAQ items"""
+        docs: List[dict] = []
+        slot_by_id: Dict[str, int] = {}
+        postings: Dict[str, Dict[int, int]] = {}
+        stem_postings: Dict[str, Dict[int, int]] = {}
+        doc_lengths: List[int] = []
+        vocabulary: Set[str] = set()
+        for item in items:
+            item = {key: value for key, value in item.items() if key != "_id"}
+            slot = slot_by_id.get(item["id"])
+            if slot is not None:
+                # A repeated id replaces the earlier item in its slot
+                docs[slot] = item
+                continue
+            slot_by_id[item["id"]] = len(docs)
+            docs.append(item)
+
+        for slot, item in enumerate(docs):
+            for term in tokenize(item["question"]) + tokenize(item["answer"]):
+                term_postings = postings.setdefault(term, {})
+                term_postings[slot] = term_postings.get(slot, 0) + 1
+
+            question_terms = bm25_terms(item["question"])
+            answer_terms = bm25_terms(item["answer"])
+            for terms, weight in ((question_terms, BM25_QUESTION_BOOST), (answer_terms, 1)):
+                for term in terms:
+                    term_postings = stem_postings.setdefault(stem(term), {})
+                    term_postings[slot] = term_postings.get(slot, 0) + weight
+            vocabulary.update(question_terms, answer_terms)
+            doc_lengths.append(BM25_QUESTION_BOOST * len(question_terms) + len(answer_terms))
+
+        self._snapshot = None
+        self._docs = docs
+        self._question_text = [item["question"].lower() for item in docs]
+        self._answer_text = [item["answer"].lower() for item in docs]
+        self._slot_by_id = slot_by_id
+        self._postings = postings
+        self._stem_postings = stem_postings
+        self._doc_lengths = doc_lengths
+        self._total_length = sum(doc_lengths)
+        self._terms = sorted(postings)
+        self._term_postings = [postings[term] for term in self._terms]
+        self._suffixes = sorted(
+            (term[start:], number)
+            for number, term in enumerate(self._terms)
+            for start in range(len(term))
+        )
+        self._bm25_terms = sorted(vocabulary)
+        self.ready = True
+
+    def save_snapshot(self, path: str, encode_item: Callable[[dict], bytes], meta: Optional[dict] = None):
+        """Write the index to a snapshot file for ``load_snapshot()``.
+
+        ``encode_item`` produces the JSON stored for each item, which
+        ``encode_items()`` then serves without encoding it again.
+        """
+        writer = SnapshotWriter()
+        writer.add_strings("docs", (encode_item(item) for item in self._docs))
+        writer.add_strings("question", self._question_text)
+        writer.add_strings("answer", self._answer_text)
+        writer.add_map("ids", self._slot_by_id)
+        writer.add_postings("postings", self._postings)
+        writer.add_postings("stems", self._stem_postings)
+        writer.add_strings("bm25_terms", self._bm25_terms)
+        writer.add_array("doc_lengths", array("I", self._doc_lengths))
+        writer.add_array("suffixes.terms", array("I", (number for _, number in self._suffixes)))
+        writer.add_array("suffixes.starts", array("I", (
+            len(self._terms[number]) - len(suffix) for suffix, number in self._suffixes
+        )))
+        writer.write(path, dict(meta or {}, total_length=self._total_length))
+
+    def load_snapshot(self, path: str) -> dict:
+        """Serve from a memory-mapped snapshot file; returns its metadata"""
+        snapshot = Snapshot(path)
+        terms = snapshot.strings("postings.keys")
+        self._docs = snapshot.json("docs")
+        self._question_text = snapshot.strings("question")
+        self._answer_text = snapshot.strings("answer")
+        self._slot_by_id = snapshot.map("ids")
+        self._postings = snapshot.postings("postings")
+        self._stem_postings = snapshot.postings("stems")
+        self._bm25_terms = snapshot.strings("bm25_terms")
+        self._doc_lengths = snapshot.array("doc_lengths")
+        self._total_length = snapshot.meta["total_length"]
+        self._terms = terms
+        self._term_postings = self._postings.lists
+        self._suffixes = SuffixTable(terms, snapshot.array("suffixes.terms"), snapshot.array("suffixes.starts"))
+        self._snapshot = snapshot
+        self.ready = True
+        return snapshot.meta
+
+    def encode_items(self, items: List[dict], encode_item: Callable[[dict], bytes]) -> bytes:
+        """JSON array of indexed items, reusing the snapshot's encoded JSON when loaded from one"""
+        if self._snapshot is None:
+            parts = [encode_item(item) for item in items]
+        else:
+            parts = [self._docs.raw(self._slot_by_id[item["id"]]) for item in items]
+        return b"[" + b",".join(parts) + b"]"
+
+    def _slots_containing(self, fragment: str) -> Set[int]:
+        """Slots of all documents with a term that contains ``fragment``"""
+        slots: Set[int] = set()
+        seen_terms = set()
+        position = bisect_left(self._suffixes, (fragment,))
+        while position < len(self._suffixes):
+            suffix, number = self._suffixes[position]
+            if not suffix.startswith(fragment):
+                break
+            if number not in seen_terms:
+                seen_terms.add(number)
+                slots.update(self._term_postings[number])
+            position += 1
+        return slots
+
+    def _candidates(self, words: List[str]) -> Set[int]:
+        candidates: Set[int] = set()
+        for word in words:
+            fragments = tokenize(word)
+            if not fragments:
+                # Punctuation-only words can match anywhere, so every document is a candidate
+                return set(self._slot_by_id.values())
+            word_slots = None
+            for fragment in fragments:
+                slots = self._slots_containing(fragment)
+                word_slots = slots if word_slots is None else word_slots & slots
+                if not word_slots:
+                    break
+            candidates |= word_slots
+        return candidates
+
+    def search(self, query: str, limit: int, stats: Optional[dict] = None) -> List[dict]:
+        """Return the best matching FAQ items for ``query``.
+
+        Scores the lower-cased texts exactly like the original full scan.
+        Only a query containing an umlaut or ß is matched against folded
+        texts as well, so "Schlüssel" also finds "Schluessel". If ``stats``
+        is given, the number of scored candidates is stored in it.
+        """
+        search_query = query.strip().lower()
+        folded_query = search_query.translate(UMLAUT_MAP)
+        fold = folded_query != search_query
+        if fold:
+            search_query = folded_query
+        search_words = search_query.split()
+
+        candidates = self._candidates(search_words)
+        if stats is not None:
+            stats["candidates"] = len(candidates)
+        scored_results = []
+        for slot in sorted(candidates):
+            question_text = self._question_text[slot]
+            answer_text = self._answer_text[slot]
+            if fold:
+                question_text = question_text.translate(UMLAUT_MAP)
+                answer_text = answer_text.translate(UMLAUT_MAP)
+            score = 0
+
+            if search_query in question_text:
+                score += PHRASE_IN_QUESTION
+            if search_query in answer_text:
+                score += PHRASE_IN_ANSWER
+
+            for word in search_words:
+                if word in question_text:
+                    score += WORD_IN_QUESTION
+                if word in answer_text:
+                    score += WORD_IN_ANSWER
+
+            if score > 0:
+                scored_results.append((slot, score))
+
+        scored_results.sort(key=lambda x: x[1], reverse=True)
+        return [self._docs[slot] for slot, _ in scored_results[:limit]]
+
+    def _complete(self, prefix: str) -> List[str]:
+        """BM25 vocabulary terms starting with ``prefix``, shortest first"""
+        matches = []
+        terms = self._bm25_terms
+        position = bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix):
+            matches.append(terms[position])
+            position += 1
+        matches.sort(key=len)
+        return matches[:MAX_PREFIX_EXPANSIONS]
+
+    def _bm25_scores(self, stemmed: str) -> Dict[int, float]:
+        postings = self._stem_postings.get(stemmed)
+        if not postings:
+            return {}
+        doc_count = len(self._slot_by_id)
+        average_length = self._total_length / doc_count
+        idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+        scores = {}
+        for slot, tf in postings.items():
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[slot] / average_length)
+            scores[slot] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search_bm25(self, query: str, limit: int, stats: Optional[dict] = None) -> List[dict]:
+        """Rank FAQ items with BM25 over stemmed terms.
+
+        Unless the query ends in whitespace, its last term is treated as an
+        unfinished word and expanded to every vocabulary term it prefixes,
+        so "mebi" already finds "mebis".
+        """
+        if stats is not None:
+            stats["candidates"] = 0
+        terms = bm25_terms(query)
+        if not terms or not self._slot_by_id:
+            return []
+
+        prefix = None
+        if not query[-1].isspace():
+            prefix = terms.pop()
+
+        totals: Dict[int, float] = {}
+        for stemmed in {stem(term) for term in terms}:
+            for slot, score in self._bm25_scores(stemmed).items():
+                totals[slot] = totals.get(slot, 0.0) + score
+
+        if prefix is not None:
+            # Each document counts only its best completion of the prefix
+            best: Dict[int, float] = {}
+            stems = {stem(prefix)} | {stem(term) for term in self._complete(prefix)}
+            for stemmed in stems:
+                for slot, score in self._bm25_scores(stemmed).items():
+                    if score > best.get(slot, 0.0):
+                        best[slot] = score
+            for slot, score in best.items():
+                totals[slot] = totals.get(slot, 0.0) + score
+
+        if stats is not None:
+            stats["candidates"] = len(totals)
+        ranked = sorted(totals.items(), key=lambda x: (-x[1], x[0]))
+        return [self._docs[slot] for slot, _ in ranked[:limit]]
+
+
+class QueryPopularity:
+    """Frequency counts of normalized search queries.
+
+    Only updated from the event loop, so plain dict updates need no
+    locking. Once more than ``max_entries`` distinct queries are tracked,
+    the rarer half is dropped and the remaining counts are halved, which
+    bounds memory and lets new favourites overtake old ones.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # normalized query -> [count, most recent spelling]
+        self._counts: Dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def record(self, query: str):
+        """Count one search for ``query``"""
+        key = normalize_query(query)
+        if not key:
+            return
+        entry = self._counts.get(key)
+        if entry is None:
+            entry = self._counts[key] = [0, ""]
+        entry[0] += 1
+        entry[1] = " ".join(query.split())
+        if len(self._counts) > self.max_entries:
+            kept = heapq.nlargest(self.max_entries // 2, self._counts.items(), key=lambda x: x[1][0])
+            self._counts = {key: [max(1, count // 2), text] for key, (count, text) in kept}
+
+    def counts(self) -> Dict[str, list]:
+        """Tracked counts as ``{normalized query: [count, spelling]}``, for other processes"""
+        return self._counts
+
+    @classmethod
+    def merged(cls, tables: Iterable[Dict[str, list]]) -> "QueryPopularity":
+        """Sum of the counts exported by several processes"""
+        popularity = cls()
+        merged = popularity._counts
+        for counts in tables:
+            for key, (count, text) in counts.items():
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = [count, text]
+                else:
+                    entry[0] += count
+        return popularity
+
+    def top(self, limit: int, prefix: str = "") -> List[Tuple[str, int]]:
+        """Most frequent queries as ``(query, count)``, optionally starting with ``prefix``"""
+        prefix = normalize_query(prefix)
+        entries = (entry for key, entry in self._counts.items() if key.startswith(prefix))
+        return [(text, count) for count, text in heapq.nlargest(limit, entries, key=lambda x: x[0])]
@@ -1,15 +1,39 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse, Response
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, NetworkTimeout, OperationFailure
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
 import os
 import json
+import tempfile
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import re
 
+from content_cache import (
+    ContentCache, LRUCache, choose_encoding, compress, encode_json, etag_matches, http_date, make_etag,
+    not_modified_since,
+)
+from faq_import import sync_faq_items
+from offline_bundle import build_bundle, delta_base, update_timestamps
+from metrics import (
+    MULTIPROCESS_DIR as METRICS_MULTIPROCESS_DIR, REQUEST_LATENCY, SEARCH_CANDIDATES, SEARCH_SCORING,
+    MongoCommandMetrics, cache_stats,
+    record_stage, render_metrics, server_timing_header, stage, start_request_timing,
+)
+from index_snapshot import read_meta as read_snapshot_meta
+from search_index import FAQSearchIndex, QueryPopularity, bm25_terms
+from write_buffer import BufferFull, PendingPreferences, PreferencesWriteBuffer
+
 app = FastAPI(title="iPad-Hilfe API", description="Modern FAQ API for iPad Help App")
 
 # CORS middleware
@@ -19,19 +43,282 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
 
-# MongoDB connection
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record request latency per route and report stage timings in Server-Timing"""
+    timings = start_request_timing()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        total = time.perf_counter() - start
+        response.headers["Server-Timing"] = server_timing_header(timings, total)
+        response.headers["Timing-Allow-Origin"] = "*"
+        return response
+    finally:
+        # Label by route template so ids in paths don't create new series
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            route.path if route else "unmatched", request.method, str(status)
+        ).observe(time.perf_counter() - start)
+
+# Server error code for duplicate key violations, also raised when building a unique index
+DUPLICATE_KEY_ERROR = 11000
+
+# Database access settings
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'ipad_hilfe')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_TIMEOUT_MS = int(os.environ.get('MONGO_TIMEOUT_MS', '5000'))
+# Full collection reads and the content sync, which scale with the corpus
+MONGO_BULK_TIMEOUT_MS = int(os.environ.get('MONGO_BULK_TIMEOUT_MS', '120000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '2000'))
+DB_RETRY_INTERVAL = float(os.environ.get('DB_RETRY_INTERVAL', '5'))
+FAQ_SNAPSHOT_FALLBACK = os.environ.get('FAQ_SNAPSHOT_FALLBACK', '1') != '0'
+DB_EXECUTOR_WORKERS = int(os.environ.get('DB_EXECUTOR_WORKERS', '16'))
+CATEGORIES_CACHE_TTL = float(os.environ.get('CATEGORIES_CACHE_TTL', '300'))
+CONTENT_CACHE_MAX_ENTRIES = int(os.environ.get('CONTENT_CACHE_MAX_ENTRIES', '1024'))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '2048'))
+BUNDLE_CACHE_MAX_ENTRIES = int(os.environ.get('BUNDLE_CACHE_MAX_ENTRIES', '32'))
+POPULAR_QUERIES_MAX = int(os.environ.get('POPULAR_QUERIES_MAX', '10000'))
+# How often to check MongoDB for added, edited or removed FAQ items
+CONTENT_REFRESH_INTERVAL = float(os.environ.get('CONTENT_REFRESH_INTERVAL', '10'))
+# Set by the entry point below for its uvicorn workers only
+WORKER_MODE = os.environ.get('IPAD_HILFE_WORKER') == '1'
+# Shared index snapshot of the multi-worker mode, set by the entry point below
+FAQ_SNAPSHOT_PATH = os.environ.get('FAQ_SNAPSHOT_PATH', '')
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get('SNAPSHOT_CHECK_INTERVAL', '2'))
+# Where workers of the multi-worker mode share their popular query counts, set by the entry point
+POPULAR_QUERIES_DIR = os.environ.get('POPULAR_QUERIES_DIR', '')
+WORKER_STATS_INTERVAL = float(os.environ.get('WORKER_STATS_INTERVAL', '5'))
+PREFERENCES_FLUSH_INTERVAL = float(os.environ.get('PREFERENCES_FLUSH_INTERVAL', '0.5'))
+PREFERENCES_MAX_PENDING = int(os.environ.get('PREFERENCES_MAX_PENDING', '100'))
+PREFERENCES_MAX_BUFFERED = int(os.environ.get('PREFERENCES_MAX_BUFFERED', '10000'))
+PREFERENCES_CACHE_SIZE = int(os.environ.get('PREFERENCES_CACHE_SIZE', '10000'))
+PREFERENCES_CACHE_TTL = float(os.environ.get('PREFERENCES_CACHE_TTL', '300'))
+FAQ_CACHE_MAX_AGE = int(os.environ.get('FAQ_CACHE_MAX_AGE', '60'))
+FAQ_CACHE_CONTROL = f"public, max-age={FAQ_CACHE_MAX_AGE}, must-revalidate"
+SUMMARY_SNIPPET_LENGTH = int(os.environ.get('SUMMARY_SNIPPET_LENGTH', '160'))
+
+# MongoDB connection; connect=False defers connecting until the first query,
+# so importing the app never waits on server selection
 try:
-    MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-    client = MongoClient(MONGO_URL)
-    db = client.ipad_hilfe
+    client = MongoClient(
+        MONGO_URL,
+        connect=False,
+        event_listeners=[MongoCommandMetrics()],
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_TIMEOUT_MS,
+    )
+    db = client[MONGO_DB_NAME]
     faq_collection = db.faq_items
     preferences_collection = db.user_preferences
-    print(f"Connected to MongoDB at: {MONGO_URL}")
+    print(f"MongoDB client configured for: {MONGO_URL}")
 except Exception as e:
     print(f"MongoDB connection error: {e}")
 
+class DatabaseUnavailable(Exception):
+    """MongoDB could not be reached"""
+
+class DatabaseTimeout(DatabaseUnavailable):
+    """A MongoDB call did not finish in time"""
+
+# Connection health shared by all requests. After a connection failure,
+# calls fail fast until retry_at instead of each waiting for server selection.
+db_state = {"available": None, "retry_at": 0.0, "last_error": None}
+
+# Where the served FAQ content currently comes from: the built-in snapshot or MongoDB
+content_state = {"source": None}
+
+# pymongo is blocking, so every database call runs in a bounded thread pool
+# instead of on the event loop
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+
+async def run_db(func, *args, timeout_ms: int = MONGO_TIMEOUT_MS, **kwargs):
+    """Run a blocking pymongo call in the database thread pool.
+
+    Only connection failures mark the database unavailable; a call that runs
+    past ``timeout_ms`` raises DatabaseTimeout without affecting other calls.
+    """
+    if db_state["available"] is False and time.monotonic() < db_state["retry_at"]:
+        raise DatabaseUnavailable(db_state["last_error"])
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(
+            loop.run_in_executor(db_executor, partial(func, *args, **kwargs)),
+            timeout=timeout_ms / 1000,
+        )
+    except (asyncio.TimeoutError, NetworkTimeout, ExecutionTimeout) as e:
+        raise DatabaseTimeout(str(e) or type(e).__name__) from e
+    except ConnectionFailure as e:
+        db_state["available"] = False
+        db_state["retry_at"] = time.monotonic() + DB_RETRY_INTERVAL
+        db_state["last_error"] = str(e) or type(e).__name__
+        raise DatabaseUnavailable(db_state["last_error"]) from e
+    finally:
+        record_stage("db", time.perf_counter() - start)
+    db_state["available"] = True
+    return result
+
+# In-memory search index, built at startup from the FAQ collection and
+# replaced as a whole by load_search_index
+search_index = FAQSearchIndex()
+
+async def write_preferences(operations):
+    """Apply buffered preference updates in one round trip"""
+    await run_db(preferences_collection.bulk_write, operations, ordered=True)
+
+# Hot preference documents as last written; None caches "no document stored".
+# Workers of the multi-worker mode would not see each other's writes in it,
+# so there it stays empty and every read goes to MongoDB.
+preferences_cache = LRUCache(
+    max_entries=0 if WORKER_MODE else PREFERENCES_CACHE_SIZE,
+    ttl=PREFERENCES_CACHE_TTL,
+)
+
+# Preference updates are coalesced per user and written in batches, except in
+# the multi-worker mode (see write_preferences_now)
+preferences_buffer = PreferencesWriteBuffer(
+    write_preferences,
+    max_pending=PREFERENCES_MAX_PENDING,
+    max_buffered=PREFERENCES_MAX_BUFFERED,
+    flush_interval=PREFERENCES_FLUSH_INTERVAL,
+    # A read that raced the write may predate it and must not be cached
+    on_written=preferences_cache.advance_epoch,
+)
+
+async def write_preferences_now(user_id: str, change: Callable[[PendingPreferences], None]):
+    """Store one user's change before responding, as workers can't see each other's buffers"""
+    entry = PendingPreferences()
+    change(entry)
+    await write_preferences(entry.operations(user_id))
+
+cache_stats.register("categories", lambda: (categories_cache["hits"], categories_cache["misses"]))
+cache_stats.register("faq_content", lambda: (content_cache.hits, content_cache.misses))
+cache_stats.register("search", lambda: (search_cache.hits, search_cache.misses))
+cache_stats.register("bundle", lambda: (bundle_cache.hits, bundle_cache.misses))
+cache_stats.register("preferences", lambda: (preferences_cache.hits, preferences_cache.misses))
+
+# Cached /api/categories response body, dropped whenever FAQ content changes
+categories_cache = {"body": None, "etag": None, "expires_at": 0.0, "hits": 0, "misses": 0}
+
+# Pre-serialized FAQ responses keyed by query shape, scoped to the corpus version
+content_cache = ContentCache(max_entries=CONTENT_CACHE_MAX_ENTRIES)
+
+# Encoded search results keyed by the query as the chosen ranking mode sees it
+search_cache = ContentCache(max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+# Compressed offline bundles keyed by delta base and content coding. Their ETags
+# hash the bytes alone, so every worker and CDN node agrees on them.
+bundle_cache = ContentCache(max_entries=BUNDLE_CACHE_MAX_ENTRIES)
+
+# Bundle inputs, derived once per content version
+bundle_state = {"content_version": None, "items": [], "categories": [], "timestamps": []}
+
+# How often each query was searched, for instant suggestions
+popular_queries = QueryPopularity(max_entries=POPULAR_QUERIES_MAX)
+
+# Counts of all workers, merged at most once per WORKER_STATS_INTERVAL
+shared_popularity = {"queries": None, "expires": 0.0}
+
+def publish_popular_queries():
+    """Write this worker's query counts for the other workers"""
+    path = os.path.join(POPULAR_QUERIES_DIR, f"{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(popular_queries.counts(), f)
+    os.replace(path + ".tmp", path)
+
+def all_popular_queries() -> QueryPopularity:
+    """Query counts of every worker, or of this process when it runs alone"""
+    if not POPULAR_QUERIES_DIR:
+        return popular_queries
+    if shared_popularity["queries"] is None or time.monotonic() >= shared_popularity["expires"]:
+        tables = [popular_queries.counts()]
+        own_file = f"{os.getpid()}.json"
+        for name in os.listdir(POPULAR_QUERIES_DIR):
+            # Files of exited workers are kept, their searches still count
+            if name.endswith(".json") and name != own_file:
+                try:
+                    with open(os.path.join(POPULAR_QUERIES_DIR, name)) as f:
+                        tables.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        shared_popularity["queries"] = QueryPopularity.merged(tables)
+        shared_popularity["expires"] = time.monotonic() + WORKER_STATS_INTERVAL
+    return shared_popularity["queries"]
+
+def publish_worker_stats():
+    """Share this worker's popular queries and cache counters with the other workers"""
+    if POPULAR_QUERIES_DIR:
+        publish_popular_queries()
+    if METRICS_MULTIPROCESS_DIR:
+        cache_stats.publish()
+
+async def publish_worker_stats_periodically():
+    while True:
+        await asyncio.sleep(WORKER_STATS_INTERVAL)
+        try:
+            publish_worker_stats()
+        except Exception as e:
+            print(f"Worker stats error: {e}")
+
+def invalidate_faq_caches(last_modified: Optional[datetime] = None):
+    """Drop cached responses derived from FAQ content.
+
+    ``last_modified`` is when the content changed, by default now. It is
+    not the newest updated_at of the items: deleting an item leaves that
+    unchanged.
+    """
+    categories_cache["body"] = None
+    categories_cache["etag"] = None
+    categories_cache["expires_at"] = 0.0
+    content_cache.bump(last_modified)
+    search_cache.bump(content_cache.last_modified)
+    bundle_cache.bump(content_cache.last_modified)
+
+def cached_json_response(
+    body: bytes,
+    etag: str,
+    if_none_match: Optional[str],
+    cache_control: str,
+    last_modified: Optional[datetime] = None,
+    if_modified_since: Optional[str] = None,
+    extra_headers: Optional[dict] = None,
+) -> Response:
+    """Serve pre-encoded JSON, answering conditional requests with 304"""
+    headers = {"ETag": etag, "Cache-Control": cache_control, **(extra_headers or {})}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    # If-Modified-Since is only consulted when the client sent no ETag
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = not_modified_since(if_modified_since, last_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def faq_response(entry, if_none_match: Optional[str], if_modified_since: Optional[str]) -> Response:
+    """Serve a ``(body, etag, headers)`` entry from the content cache"""
+    body, etag, headers = entry
+    return cached_json_response(
+        body, etag, if_none_match, FAQ_CACHE_CONTROL,
+        last_modified=content_cache.last_modified,
+        if_modified_since=if_modified_since,
+        extra_headers=headers,
+    )
+
+# Sentinel for cache lookups, since None is a valid cached value
+MISSING = object()
+
 # Pydantic models
 class FAQItem(BaseModel):
     id: str
@@ -41,6 +328,12 @@ class FAQItem(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class FAQSummary(BaseModel):
+    id: str
+    question: str
+    category: str
+    snippet: str
+
 class UserPreferences(BaseModel):
     user_id: str
     has_seen_intro: bool = False
@@ -55,6 +348,14 @@ class CategoryInfo(BaseModel):
     description: str
     count: int
 
+class PopularQuery(BaseModel):
+    query: str
+    count: int
+
+def encode_faq_item(item: dict) -> bytes:
+    """JSON of one FAQ item as returned by the API"""
+    return encode_json(jsonable_encoder(FAQItem(**item)))
+
 # FAQ Data - Complete German content from Swift app
 FAQ_DATA = [
     {
@@ -227,47 +528,291 @@ CATEGORIES = [
     {"name": "Multimedia & Projekte", "icon": "play-btn", "description": "Kreative Projekte"}
 ]
 
+def snapshot_items(category: Optional[str] = None, search: Optional[str] = None) -> List[dict]:
+    """FAQ items known to this process, used while MongoDB is unreachable"""
+    items = search_index.items()
+    if category:
+        items = [item for item in items if item["category"] == category]
+    if search:
+        search_lower = search.lower()
+        items = [
+            item for item in items
+            if search_lower in item["question"].lower() or search_lower in item["answer"].lower()
+        ]
+    return items
+
+def snapshot_response(data) -> Response:
+    """Serve snapshot content; it is not cached since the database is authoritative"""
+    return snapshot_body_response(encode_json(jsonable_encoder(data)))
+
+def snapshot_body_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    """Serve encoded snapshot content, without validators, marked as such"""
+    if not FAQ_SNAPSHOT_FALLBACK:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**(headers or {}), "Cache-Control": "no-store", "X-Data-Source": "snapshot"},
+    )
+
+def index_response(entry, if_none_match: Optional[str], if_modified_since: Optional[str]) -> Response:
+    """Serve a content cache entry derived from the search index.
+
+    Until the index has been loaded from MongoDB it holds the built-in
+    snapshot, which is served like any other snapshot content.
+    """
+    if content_state["source"] == "snapshot":
+        body, _, headers = entry
+        return snapshot_body_response(body, headers)
+    return faq_response(entry, if_none_match, if_modified_since)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database with FAQ data if empty"""
+    """Serve the built-in content immediately and initialize MongoDB in the background"""
+    preferences_buffer.start()
+    search_index.rebuild(FAQ_DATA)
+    content_state["source"] = "snapshot"
+    invalidate_faq_caches()
+    if WORKER_MODE:
+        # Worker of the multi-worker mode: the parent process syncs content and builds the index
+        background_tasks.add(asyncio.create_task(watch_snapshot_file(FAQ_SNAPSHOT_PATH)))
+        background_tasks.add(asyncio.create_task(publish_worker_stats_periodically()))
+    else:
+        background_tasks.add(asyncio.create_task(initialize_database()))
+
+# Long-running tasks started at startup, cancelled on shutdown
+background_tasks = set()
+
+async def initialize_database():
+    """Sync the built-in FAQ content and load the search index, retrying until MongoDB is reachable"""
+    while True:
+        try:
+            await prepare_database()
+            fingerprint = await run_db(content_fingerprint)
+            await load_search_index()
+            print(f"Search index built with {len(search_index)} FAQ items")
+            break
+        except Exception as e:
+            print(f"Database initialization error: {e}; retrying in {DB_RETRY_INTERVAL}s")
+            await asyncio.sleep(DB_RETRY_INTERVAL)
+    await refresh_content(fingerprint)
+
+async def refresh_content(fingerprint: list):
+    """Reload the search index, and with it every cached FAQ response, when FAQ items change"""
+    while True:
+        await asyncio.sleep(CONTENT_REFRESH_INTERVAL)
+        try:
+            current = await run_db(content_fingerprint)
+            if current != fingerprint:
+                await load_search_index()
+                fingerprint = current
+                print(f"FAQ content changed, search index rebuilt with {len(search_index)} FAQ items")
+        except Exception as e:
+            print(f"Content refresh error: {e}")
+
+async def prepare_database():
+    """Create indexes and sync the built-in FAQ content"""
+    await ensure_indexes()
+    
+    # Only new or edited built-in items are written
+    counts = await run_db(sync_faq_items, faq_collection, FAQ_DATA, timeout_ms=MONGO_BULK_TIMEOUT_MS)
+    print(f"FAQ content sync: {counts['changed']} items written, {counts['unchanged']} unchanged")
+
+async def ensure_indexes():
+    """Create the indexes the API queries rely on"""
+    indexes = [
+        (faq_collection, [("id", ASCENDING)], {"unique": True}),
+        (faq_collection, [("category", ASCENDING), ("_id", ASCENDING)], {}),
+        (faq_collection, [("updated_at", ASCENDING)], {}),
+        (preferences_collection, [("user_id", ASCENDING)], {"unique": True}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            await run_db(collection.create_index, keys, **options)
+        except DatabaseUnavailable:
+            raise
+        except OperationFailure as e:
+            if e.code != DUPLICATE_KEY_ERROR or not options.get("unique"):
+                print(f"Index creation error on {collection.name} {keys}: {e}")
+                continue
+            # Duplicates left by older versions block the unique index; still index the lookups
+            print(f"Duplicate keys in {collection.name} {keys}, creating a non-unique index instead")
+            try:
+                await run_db(collection.create_index, keys, **{k: v for k, v in options.items() if k != "unique"})
+            except DatabaseUnavailable:
+                raise
+            except Exception as e:
+                print(f"Index creation error on {collection.name} {keys}: {e}")
+        except Exception as e:
+            print(f"Index creation error on {collection.name} {keys}: {e}")
+
+def fetch_faq_items() -> List[dict]:
+    # maxTimeMS lets the server give up on the read together with run_db
+    return list(faq_collection.find({}, {"_id": 0}).max_time_ms(MONGO_BULK_TIMEOUT_MS))
+
+async def load_search_index():
+    """Rebuild the search index from MongoDB and start a new content version"""
+    global search_index
+    items = await run_db(fetch_faq_items, timeout_ms=MONGO_BULK_TIMEOUT_MS)
+    # Build the new index off the event loop; requests keep using the
+    # current one until it is swapped in
+    index = FAQSearchIndex()
+    await asyncio.to_thread(index.rebuild, items)
+    search_index = index
+    content_state["source"] = "database"
+    invalidate_faq_caches()
+
+def content_fingerprint() -> list:
+    """Item count and latest update of the FAQ collection, which change with every edit"""
+    latest = faq_collection.find_one({}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)])
+    updated_at = latest.get("updated_at") if latest else None
+    return [faq_collection.count_documents({}), updated_at.isoformat() if updated_at else None]
+
+def write_snapshot_file(path: str, items: List[dict], source: str, fingerprint: Optional[list] = None):
+    """Build the search index for ``items`` and atomically replace the snapshot file"""
+    index = FAQSearchIndex()
+    index.rebuild(items)
+    index.save_snapshot(path, encode_faq_item, {
+        "source": source,
+        "fingerprint": fingerprint,
+        # Every worker reports this time as Last-Modified for the new content
+        "last_modified": datetime.now(timezone.utc).isoformat(),
+    })
+
+async def maintain_snapshot_file(path: str):
+    """Keep the shared index snapshot in step with MongoDB (parent of the multi-worker mode)"""
     try:
-        # Check if FAQ data exists
-        if faq_collection.count_documents({}) == 0:
-            print("Initializing FAQ database with sample data...")
-            for item in FAQ_DATA:
-                item["created_at"] = datetime.now()
-                item["updated_at"] = datetime.now()
-            faq_collection.insert_many(FAQ_DATA)
-            print(f"Inserted {len(FAQ_DATA)} FAQ items")
-        else:
-            print(f"FAQ database already contains {faq_collection.count_documents({})} items")
+        current = read_snapshot_meta(path).get("fingerprint")
+    except (OSError, ValueError):
+        # Let workers start from the built-in content until MongoDB is reachable
+        write_snapshot_file(path, FAQ_DATA, "snapshot")
+        current = None
+    prepared = False
+    while True:
+        try:
+            if not prepared:
+                await prepare_database()
+                prepared = True
+            fingerprint = await run_db(content_fingerprint)
+            if fingerprint != current:
+                items = await run_db(fetch_faq_items, timeout_ms=MONGO_BULK_TIMEOUT_MS)
+                write_snapshot_file(path, items, "database", fingerprint)
+                current = fingerprint
+                print(f"Search index snapshot written with {len(items)} FAQ items to {path}")
+        except Exception as e:
+            print(f"Snapshot build error: {e}; retrying in {CONTENT_REFRESH_INTERVAL}s")
+        await asyncio.sleep(CONTENT_REFRESH_INTERVAL)
+
+async def watch_snapshot_file(path: str):
+    """Load the shared index snapshot and reload it whenever it is replaced"""
+    loaded = None
+    while True:
+        try:
+            stat = os.stat(path)
+            if (stat.st_ino, stat.st_mtime_ns) != loaded:
+                meta = search_index.load_snapshot(path)
+                loaded = (stat.st_ino, stat.st_mtime_ns)
+                content_state["source"] = meta["source"]
+                last_modified = meta["last_modified"]
+                invalidate_faq_caches(datetime.fromisoformat(last_modified) if last_modified else None)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Snapshot load error: {e}")
+        await asyncio.sleep(SNAPSHOT_CHECK_INTERVAL)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered writes and release database resources"""
+    for task in background_tasks:
+        task.cancel()
+    try:
+        await preferences_buffer.stop()
+    except Exception as e:
+        print(f"Preference flush error on shutdown: {e}")
+    try:
+        publish_worker_stats()
     except Exception as e:
-        print(f"Database initialization error: {e}")
+        print(f"Worker stats error on shutdown: {e}")
+    db_executor.shutdown(wait=True)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint: healthy, degraded (serving without MongoDB) or down"""
     try:
         # Test database connection
-        db.command("ping")
-        return {"status": "healthy", "database": "connected", "timestamp": datetime.now()}
+        await run_db(db.command, "ping")
+        return {
+            "status": "healthy",
+            "database": "connected",
+            "content": content_state["source"],
+            "preferences_cache": preferences_cache.stats(),
+            "timestamp": datetime.now()
+        }
+    except DatabaseUnavailable as e:
+        if FAQ_SNAPSHOT_FALLBACK:
+            return {
+                "status": "degraded",
+                "database": "unreachable",
+                "content": content_state["source"],
+                "error": str(e),
+                "timestamp": datetime.now()
+            }
+        return JSONResponse(status_code=503, content=jsonable_encoder({
+            "status": "down", "database": "unreachable", "error": str(e), "timestamp": datetime.now()
+        }))
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e), "timestamp": datetime.now()}
+        return JSONResponse(status_code=503, content=jsonable_encoder({
+            "status": "down", "error": str(e), "timestamp": datetime.now()
+        }))
 
 @app.get("/api/categories", response_model=List[CategoryInfo])
-async def get_categories():
+async def get_categories(if_none_match: Optional[str] = Header(None)):
     """Get all FAQ categories with item counts"""
     try:
-        categories_with_counts = []
-        for category in CATEGORIES:
-            count = faq_collection.count_documents({"category": category["name"]})
-            categories_with_counts.append(CategoryInfo(
-                name=category["name"],
-                icon=category["icon"],
-                description=category["description"],
-                count=count
-            ))
-        return categories_with_counts
+        if categories_cache["body"] is None or time.monotonic() >= categories_cache["expires_at"]:
+            categories_cache["misses"] += 1
+            # One aggregation pass counts every category at once
+            groups = await run_db(lambda: list(faq_collection.aggregate([
+                {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+            ])))
+            counts = {group["_id"]: group["count"] for group in groups}
+            categories_with_counts = [
+                CategoryInfo(
+                    name=category["name"],
+                    icon=category["icon"],
+                    description=category["description"],
+                    count=counts.get(category["name"], 0)
+                ).dict()
+                for category in CATEGORIES
+            ]
+            with stage("serialize"):
+                body = encode_json(categories_with_counts)
+            categories_cache["body"] = body
+            categories_cache["etag"] = make_etag(body)
+            categories_cache["expires_at"] = time.monotonic() + CATEGORIES_CACHE_TTL
+        else:
+            categories_cache["hits"] += 1
+
+        return cached_json_response(
+            categories_cache["body"],
+            categories_cache["etag"],
+            if_none_match,
+            FAQ_CACHE_CONTROL,
+        )
+    except DatabaseUnavailable:
+        counts = {}
+        for item in snapshot_items():
+            counts[item["category"]] = counts.get(item["category"], 0) + 1
+        return snapshot_response([dict(category, count=counts.get(category["name"], 0)) for category in CATEGORIES])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching categories: {str(e)}")
 
@@ -275,122 +820,318 @@ async def get_categories():
 async def get_faq_items(
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search in questions and answers"),
-    limit: int = Query(100, description="Maximum number of items to return")
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items to return"),
+    cursor: Optional[str] = Query(None, description="Continue after this cursor (from the X-Next-Cursor header)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'id,question,category'"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
     """Get FAQ items with optional filtering and search"""
     try:
-        # Build query
+        cache_key = ("faq", category, search, limit, cursor, fields)
+        cached = content_cache.get(cache_key)
+        if cached is not None:
+            return faq_response(cached, if_none_match, if_modified_since)
+        version = content_cache.version
+        
+        # Only requested fields leave the database; "id" is always included
+        if fields:
+            selected = ["id"] + [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "id"]
+            unknown = [f for f in selected if f not in FAQItem.model_fields]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        else:
+            selected = list(FAQItem.model_fields)
+        projection = {field: 1 for field in selected}
+        
+        # Build query; filters run in MongoDB so limit applies to matching items
         query = {}
         if category:
             query["category"] = category
+        if search:
+            # Substring semantics ("wlan" in "Heim-WLAN") rule out a text index, which matches
+            # whole stemmed words, and no B-tree index can seek an unanchored regex
+            pattern = {"$regex": re.escape(search), "$options": "i"}
+            query["$or"] = [{"question": pattern}, {"answer": pattern}]
+        if cursor:
+            try:
+                query["_id"] = {"$gt": ObjectId(cursor)}
+            except InvalidId:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
         
-        # Execute query
-        cursor = faq_collection.find(query).limit(limit)
-        items = list(cursor)
+        # Keyset pagination on _id; one extra item tells us whether there is a next page
+        items = await run_db(lambda: list(
+            faq_collection.find(query, projection).sort("_id", 1).limit(limit + 1)
+        ))
+        headers = {}
+        if len(items) > limit:
+            items = items[:limit]
+            headers["X-Next-Cursor"] = str(items[-1]["_id"])
         
-        # Convert MongoDB _id to string and remove it
         for item in items:
             item.pop("_id", None)
         
-        # Apply search filter if provided
-        if search:
-            search_lower = search.lower()
-            items = [
-                item for item in items
-                if search_lower in item["question"].lower() or search_lower in item["answer"].lower()
-            ]
-        
-        return items
+        with stage("serialize"):
+            if fields:
+                body = encode_json(jsonable_encoder(items))
+            else:
+                body = encode_json(jsonable_encoder([FAQItem(**item) for item in items]))
+        entry = content_cache.put(cache_key, body, version, headers)
+        return faq_response(entry, if_none_match, if_modified_since)
+    except DatabaseUnavailable:
+        # Snapshot content fits on one page; a cursor from the database means we are past it
+        items = [] if cursor else snapshot_items(category, search)[:limit]
+        if fields:
+            items = [{field: item.get(field) for field in selected} for item in items]
+        return snapshot_response(items)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching FAQ items: {str(e)}")
 
+def answer_snippet(answer: str, length: int = SUMMARY_SNIPPET_LENGTH) -> str:
+    """Plain-text preview of a markdown answer, cut at a word boundary"""
+    # Markup removal only needs to look at a prefix of the answer
+    text = answer[:length * 2].replace("*", "").replace("`", "")
+    text = " ".join(" ".join(line.lstrip("#> ") for line in text.splitlines()).split())
+    if len(text) <= length:
+        return text
+    cut = text.rfind(" ", 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + "…"
+
+@app.get("/api/faq/summary", response_model=List[FAQSummary])
+async def get_faq_summaries(
+    category: Optional[str] = Query(None, description="Filter by category"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items to return"),
+    cursor: Optional[str] = Query(None, description="Continue after this cursor (from the X-Next-Cursor header)"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """Lightweight FAQ list for overview screens: answer snippets instead of full answers"""
+    try:
+        cache_key = ("faq_summary", category, limit, cursor)
+        cached = content_cache.get(cache_key)
+        if cached is not None:
+            return faq_response(cached, if_none_match, if_modified_since)
+        version = content_cache.version
+        
+        query = {}
+        if category:
+            query["category"] = category
+        if cursor:
+            try:
+                query["_id"] = {"$gt": ObjectId(cursor)}
+            except InvalidId:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        projection = {"id": 1, "question": 1, "category": 1, "answer": 1}
+        items = await run_db(lambda: list(
+            faq_collection.find(query, projection).sort("_id", 1).limit(limit + 1)
+        ))
+        headers = {}
+        if len(items) > limit:
+            items = items[:limit]
+            headers["X-Next-Cursor"] = str(items[-1]["_id"])
+        
+        # Encoded straight from the database documents, without Pydantic
+        with stage("serialize"):
+            body = encode_json([
+                {
+                    "id": item["id"],
+                    "question": item["question"],
+                    "category": item["category"],
+                    "snippet": answer_snippet(item["answer"]),
+                }
+                for item in items
+            ])
+        entry = content_cache.put(cache_key, body, version, headers)
+        return faq_response(entry, if_none_match, if_modified_since)
+    except DatabaseUnavailable:
+        items = [] if cursor else snapshot_items(category)[:limit]
+        return snapshot_response([
+            {
+                "id": item["id"],
+                "question": item["question"],
+                "category": item["category"],
+                "snippet": answer_snippet(item["answer"]),
+            }
+            for item in items
+        ])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching FAQ summaries: {str(e)}")
+
 @app.get("/api/faq/{faq_id}", response_model=FAQItem)
-async def get_faq_item(faq_id: str):
+async def get_faq_item(
+    faq_id: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
     """Get a specific FAQ item by ID"""
     try:
-        item = faq_collection.find_one({"id": faq_id})
+        cache_key = ("faq_item", faq_id)
+        cached = content_cache.get(cache_key)
+        if cached is not None:
+            return faq_response(cached, if_none_match, if_modified_since)
+        version = content_cache.version
+        
+        item = await run_db(faq_collection.find_one, {"id": faq_id})
         if not item:
             raise HTTPException(status_code=404, detail="FAQ item not found")
         
         item.pop("_id", None)
-        return item
+        with stage("serialize"):
+            body = encode_json(jsonable_encoder(FAQItem(**item)))
+        return faq_response(content_cache.put(cache_key, body, version), if_none_match, if_modified_since)
+    except DatabaseUnavailable:
+        item = search_index.get(faq_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="FAQ item not found")
+        return snapshot_response(FAQItem(**item))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching FAQ item: {str(e)}")
 
+@app.get("/api/search/popular", response_model=List[PopularQuery])
+async def get_popular_queries(
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of queries"),
+    prefix: str = Query("", description="Only queries starting with this text")
+):
+    """Most frequent successful search queries, for instant suggestions"""
+    return [PopularQuery(query=query, count=count) for query, count in all_popular_queries().top(limit, prefix)]
+
 @app.get("/api/search", response_model=List[FAQItem])
 async def search_faq(
     q: str = Query(..., description="Search query"),
-    limit: int = Query(20, description="Maximum number of results")
+    limit: int = Query(20, description="Maximum number of results"),
+    mode: str = Query("default", pattern="^(default|bm25)$", description="Ranking mode: 'default' or 'bm25' with prefix matching"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
     """Advanced search in FAQ items"""
     try:
         if not q or len(q.strip()) < 2:
             return []
         
-        search_query = q.strip().lower()
+        # Build the index lazily if it could not be built at startup
+        if not search_index.ready:
+            await load_search_index()
         
-        # Get all items for search
-        cursor = faq_collection.find({})
-        items = list(cursor)
+        if mode == "bm25":
+            # BM25 ranks by its own terms and treats a trailing space as a finished last word
+            query_key = (" ".join(bm25_terms(q)), q[-1].isspace())
+        else:
+            # The default scorer sees exactly this, so "WLAN " and "wlan" share an entry
+            query_key = q.strip().lower()
+        cache_key = (query_key, limit, mode)
+        entry = search_cache.get(cache_key)
+        if entry is None:
+            version = search_cache.version
+            stats = {}
+            start = time.perf_counter()
+            if mode == "bm25":
+                results = search_index.search_bm25(q, limit, stats)
+            else:
+                results = search_index.search(q, limit, stats)
+            scoring_time = time.perf_counter() - start
+            record_stage("score", scoring_time)
+            SEARCH_SCORING.labels(mode).observe(scoring_time)
+            SEARCH_CANDIDATES.labels(mode).observe(stats["candidates"])
+            
+            with stage("serialize"):
+                body = search_index.encode_items(results, encode_faq_item)
+            entry = search_cache.put(cache_key, body, version)
         
-        # Remove MongoDB _id
-        for item in items:
-            item.pop("_id", None)
+        # Only queries that found something are worth suggesting
+        if entry[0] != b"[]":
+            popular_queries.record(q)
+        return index_response(entry, if_none_match, if_modified_since)
         
-        # Score and sort results
-        scored_results = []
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+def bundle_inputs() -> dict:
+    """Items, categories and update times of the current content version"""
+    if bundle_state["content_version"] != content_cache.version:
+        items = [FAQItem(**item).dict() for item in search_index.items()]
+        counts = {}
         for item in items:
-            score = 0
-            question_lower = item["question"].lower()
-            answer_lower = item["answer"].lower()
-            
-            # Exact phrase match gets highest score
-            if search_query in question_lower:
-                score += 10
-            if search_query in answer_lower:
-                score += 5
-            
-            # Word matches
-            search_words = search_query.split()
-            for word in search_words:
-                if word in question_lower:
-                    score += 3
-                if word in answer_lower:
-                    score += 1
-            
-            if score > 0:
-                scored_results.append((item, score))
+            counts[item["category"]] = counts.get(item["category"], 0) + 1
+        bundle_state.update(
+            content_version=content_cache.version,
+            items=items,
+            categories=[CategoryInfo(**category, count=counts.get(category["name"], 0)).dict() for category in CATEGORIES],
+            timestamps=update_timestamps(items),
+        )
+    return bundle_state
+
+def encode_bundle(inputs: dict, since: int, encoding: str) -> bytes:
+    return compress(encode_json(build_bundle(inputs["items"], inputs["categories"], since)), encoding)
+
+@app.get("/api/bundle")
+async def get_bundle(
+    since: int = Query(0, ge=0, description="Bundle version the client already has; only newer items are sent"),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """All FAQ items, categories and a client search index for offline use"""
+    try:
+        if not search_index.ready:
+            await load_search_index()
         
-        # Sort by score and return top results
-        scored_results.sort(key=lambda x: x[1], reverse=True)
-        return [item for item, _ in scored_results[:limit]]
+        inputs = bundle_inputs()
+        base = delta_base(inputs["timestamps"], since)
+        encoding = choose_encoding(accept_encoding)
+        cache_key = (base, encoding)
+        entry = bundle_cache.get(cache_key)
+        if entry is None:
+            version = bundle_cache.version
+            with stage("serialize"):
+                # Built in a thread: compressing large corpora releases the GIL
+                body = await asyncio.to_thread(encode_bundle, inputs, base, encoding)
+            headers = {"Vary": "Accept-Encoding"}
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+            entry = bundle_cache.put(cache_key, body, version, headers, etag=make_etag(body))
+        return index_response(entry, if_none_match, if_modified_since)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error building bundle: {str(e)}")
 
 @app.get("/api/preferences/{user_id}", response_model=UserPreferences)
 async def get_user_preferences(user_id: str):
     """Get user preferences"""
     try:
-        prefs = preferences_collection.find_one({"user_id": user_id})
+        prefs = preferences_cache.get(user_id, MISSING)
+        if prefs is MISSING:
+            if preferences_buffer.has_document(user_id):
+                prefs = None
+            else:
+                epoch = preferences_cache.epoch
+                prefs = await run_db(preferences_collection.find_one, {"user_id": user_id}, {"_id": 0})
+                if preferences_cache.epoch == epoch:
+                    preferences_cache.load(user_id, prefs, epoch)
+                else:
+                    # A buffered write may have landed during the read and
+                    # no longer be overlaid below, so read once more
+                    prefs = await run_db(preferences_collection.find_one, {"user_id": user_id}, {"_id": 0})
+        
+        # Queued writes are overlaid so clients read their own updates
+        prefs = preferences_buffer.apply(user_id, prefs)
         if not prefs:
-            # Create default preferences
-            default_prefs = {
-                "user_id": user_id,
-                "has_seen_intro": False,
-                "favorites": [],
-                "theme": "light",
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            preferences_collection.insert_one(default_prefs)
-            default_prefs.pop("_id", None)
-            return default_prefs
+            # Defaults are only persisted by the first real update
+            return UserPreferences(user_id=user_id)
         
-        prefs.pop("_id", None)
-        return prefs
+        return dict(prefs, user_id=user_id)
+    except DatabaseUnavailable:
+        raise HTTPException(status_code=503, detail="Preferences are temporarily unavailable")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching preferences: {str(e)}")
 
@@ -400,17 +1141,104 @@ async def update_user_preferences(user_id: str, preferences: UserPreferences):
     try:
         prefs_dict = preferences.dict()
         prefs_dict["updated_at"] = datetime.now()
+        if WORKER_MODE:
+            await write_preferences_now(user_id, lambda entry: entry.replace(prefs_dict))
+            return {"success": True, "queued": False}
         
-        result = preferences_collection.update_one(
-            {"user_id": user_id},
-            {"$set": prefs_dict},
-            upsert=True
-        )
+        # Written by the preferences buffer in the next batch
+        preferences_buffer.queue_replace(user_id, prefs_dict)
+        preferences_cache.write(user_id, prefs_dict)
         
-        return {"success": True, "modified": result.modified_count > 0}
+        return {"success": True, "queued": True}
+    except (BufferFull, DatabaseUnavailable):
+        raise HTTPException(status_code=503, detail="Preferences are temporarily unavailable")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating preferences: {str(e)}")
 
+@app.post("/api/preferences/{user_id}/favorites/{faq_id}")
+async def add_favorite(user_id: str, faq_id: str):
+    """Add an FAQ item to the user's favorites ($addToSet)"""
+    try:
+        if WORKER_MODE:
+            await write_preferences_now(user_id, lambda entry: entry.favorite(faq_id, add=True))
+            return {"success": True, "queued": False}
+        preferences_buffer.queue_favorite(user_id, faq_id, add=True)
+        preferences_cache.modify(user_id, partial(preferences_buffer.apply, user_id))
+        return {"success": True, "queued": True}
+    except (BufferFull, DatabaseUnavailable):
+        raise HTTPException(status_code=503, detail="Preferences are temporarily unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding favorite: {str(e)}")
+
+@app.delete("/api/preferences/{user_id}/favorites/{faq_id}")
+async def remove_favorite(user_id: str, faq_id: str):
+    """Remove an FAQ item from the user's favorites ($pull)"""
+    try:
+        if WORKER_MODE:
+            await write_preferences_now(user_id, lambda entry: entry.favorite(faq_id, add=False))
+            return {"success": True, "queued": False}
+        preferences_buffer.queue_favorite(user_id, faq_id, add=False)
+        preferences_cache.modify(user_id, partial(preferences_buffer.apply, user_id))
+        return {"success": True, "queued": True}
+    except (BufferFull, DatabaseUnavailable):
+        raise HTTPException(status_code=503, detail="Preferences are temporarily unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing favorite: {str(e)}")
+
+# Entry point.
+#
+#   python server.py                      one process, as before
+#   python server.py --workers 4          one uvicorn worker per CPU core
+#
+# With more than one worker, this process only maintains the search index:
+# it syncs the built-in FAQ content, builds the index once and writes it,
+# together with the encoded JSON of every item, to a snapshot file
+# (--snapshot or FAQ_SNAPSHOT_PATH). Workers memory-map that file
+# read-only, so they share one copy of the index and start without
+# loading the FAQ collection. The parent checks MongoDB every
+# CONTENT_REFRESH_INTERVAL seconds and atomically replaces the file when
+# FAQ items were added, edited or removed; workers notice the new file
+# within SNAPSHOT_CHECK_INTERVAL seconds and switch to it. Response caches
+# stay per worker. Preference changes are written to MongoDB before the
+# response and preferences are read from there, so every worker sees a
+# change at once. Prometheus metrics and popular query counts are shared
+# through files in a temporary directory, so /metrics and
+# /api/search/popular cover all workers. In single-process mode the server
+# itself checks every CONTENT_REFRESH_INTERVAL seconds and rebuilds its
+# index, e.g. after a bulk import with faq_import.py.
 if __name__ == "__main__":
+    import argparse
+    import shutil
+    import threading
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Run the iPad-Hilfe API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', '1')))
+    parser.add_argument(
+        "--snapshot",
+        default=FAQ_SNAPSHOT_PATH or os.path.join(tempfile.gettempdir(), "ipad-hilfe-faq.snapshot"),
+        help="Index snapshot file shared by the workers",
+    )
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        snapshot_path = os.path.abspath(args.snapshot)
+        os.environ["FAQ_SNAPSHOT_PATH"] = snapshot_path
+        os.environ["IPAD_HILFE_WORKER"] = "1"
+        # Workers import prometheus_client after these are set, which puts it in multiprocess mode
+        stats_dir = tempfile.mkdtemp(prefix="ipad-hilfe-stats-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(stats_dir, "metrics")
+        os.environ["POPULAR_QUERIES_DIR"] = os.path.join(stats_dir, "popular-queries")
+        os.mkdir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+        os.mkdir(os.environ["POPULAR_QUERIES_DIR"])
+        threading.Thread(
+            target=asyncio.run, args=(maintain_snapshot_file(snapshot_path),), name="snapshot-builder", daemon=True
+        ).start()
+        try:
+            uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
+        finally:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
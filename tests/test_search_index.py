@@ -0,0 +1,74 @@
+import os
+import sys
+
+import orjson
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from corpus import generate_faq_items, search_queries
+from search_index import FAQSearchIndex
+from search_micro import CATEGORIES, full_scan_search
+
+# Substrings of terms, whitespace and punctuation the original scorer treats specially
+EDGE_QUERIES = [
+    "ens", "eu", "ue", "ae", "wlan", "WLAN  drucken", "  Fotos ", "Apple-ID", "apple id",
+    "(#12)", "...", "?", "a-b", "mebis.", "Schul-WLAN", "oeffne", "pruefung",
+]
+
+
+@pytest.fixture(scope="module")
+def items():
+    corpus = list(generate_faq_items(2000, CATEGORIES, seed=3))
+    corpus.append({
+        "id": "umlaut",
+        "question": "Wo finde ich den Schluessel?",
+        "answer": "Er liegt im Sekretariat.",
+        "category": "Grundlagen",
+    })
+    return corpus
+
+
+@pytest.fixture(scope="module")
+def index(items):
+    index = FAQSearchIndex()
+    index.rebuild(items)
+    return index
+
+
+def ids(results):
+    return [item["id"] for item in results]
+
+
+def test_search_ranks_like_the_full_scan(items, index):
+    queries = search_queries(seed=5, count=300) + EDGE_QUERIES
+    for query in queries:
+        if any(letter in query.lower() for letter in "äöüß"):
+            continue
+        assert ids(index.search(query, 20)) == ids(full_scan_search(items, query, 20)), query
+
+
+def test_umlaut_queries_also_find_the_folded_spelling(items, index):
+    full_scan = ids(full_scan_search(items, "Schlüssel", 20))
+    assert full_scan == []
+    assert ids(index.search("Schlüssel", 20)) == ["umlaut"]
+    # Without an umlaut in the query, the folded spelling is matched literally
+    assert ids(index.search("Schluessel", 20)) == ["umlaut"]
+    for query in ("Prüfung", "öffne"):
+        assert set(ids(full_scan_search(items, query, len(items)))) <= set(ids(index.search(query, len(items))))
+
+
+def test_snapshot_round_trip_gives_the_same_results(index, tmp_path):
+    path = str(tmp_path / "faq.snapshot")
+    index.save_snapshot(path, orjson.dumps, {"version": 1})
+    loaded = FAQSearchIndex()
+    meta = loaded.load_snapshot(path)
+    assert meta["version"] == 1
+    assert len(loaded) == len(index)
+    assert loaded.items() == index.items()
+
+    for query in search_queries(seed=7, count=200) + EDGE_QUERIES + ["Schlüssel", "mebi", "Drucker "]:
+        assert ids(loaded.search(query, 20)) == ids(index.search(query, 20)), query
+        assert ids(loaded.search_bm25(query, 20)) == ids(index.search_bm25(query, 20)), query
+    assert loaded.get("umlaut") == index.get("umlaut")
+    assert loaded.encode_items(index.items()[:3], orjson.dumps) == index.encode_items(index.items()[:3], orjson.dumps)
@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+
+from content_cache import LRUCache
+from write_buffer import BufferFull, PreferencesWriteBuffer
+
+
+class FakeCollection:
+    """Records bulk writes; can be made to fail or to block until released"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+        self.release = None
+
+    async def write(self, operations):
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise ConnectionError("database down")
+        self.batches.append(operations)
+
+
+def describe(operations):
+    return [(op._filter, op._doc, op._upsert) for op in operations]
+
+
+def make_buffer(collection, **kwargs):
+    kwargs.setdefault("max_pending", 1000)
+    return PreferencesWriteBuffer(collection.write, **kwargs)
+
+
+def test_replace_and_favorites_coalesce_into_one_write():
+    async def scenario():
+        collection = FakeCollection()
+        buffer = make_buffer(collection)
+        buffer.queue_favorite("u1", "a", add=True)
+        buffer.queue_replace("u1", {"user_id": "u1", "theme": "dark", "favorites": ["b"]})
+        buffer.queue_favorite("u1", "c", add=True)
+        buffer.queue_favorite("u1", "b", add=False)
+        await buffer.flush()
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert len(collection.batches) == 1
+    [(selector, update, upsert)] = describe(collection.batches[0])
+    assert selector == {"user_id": "u1"}
+    assert upsert
+    assert update["$set"]["theme"] == "dark"
+    assert update["$set"]["favorites"] == ["c"]
+
+
+def test_favorite_toggles_coalesce_to_add_and_pull():
+    async def scenario():
+        collection = FakeCollection()
+        buffer = make_buffer(collection)
+        buffer.queue_favorite("u1", "a", add=True)
+        buffer.queue_favorite("u1", "b", add=True)
+        buffer.queue_favorite("u1", "a", add=False)
+        await buffer.flush()
+        return collection
+
+    collection = asyncio.run(scenario())
+    add, pull = describe(collection.batches[0])
+    assert add[1]["$addToSet"] == {"favorites": {"$each": ["b"]}}
+    assert add[2] is True
+    assert pull[1]["$pull"] == {"favorites": {"$in": ["a"]}}
+    assert pull[2] is False
+
+
+def test_reads_see_pending_and_inflight_changes():
+    async def scenario():
+        collection = FakeCollection()
+        collection.release = asyncio.Event()
+        buffer = make_buffer(collection)
+        stored = {"user_id": "u1", "theme": "light", "favorites": ["a"]}
+
+        buffer.queue_favorite("u1", "b", add=True)
+        assert buffer.apply("u1", stored)["favorites"] == ["a", "b"]
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        # In flight: no longer pending, but not written yet either
+        assert len(buffer) == 0
+        buffer.queue_favorite("u1", "a", add=False)
+        assert buffer.apply("u1", stored)["favorites"] == ["b"]
+
+        collection.release.set()
+        await flush
+        assert buffer.apply("u1", {"user_id": "u1", "favorites": ["a", "b"]})["favorites"] == ["b"]
+        assert buffer.apply("u2", None) is None
+
+    asyncio.run(scenario())
+
+
+def test_read_racing_a_finished_flush_is_not_cached():
+    async def scenario():
+        cache = LRUCache()
+        collection = FakeCollection()
+        collection.release = asyncio.Event()
+        buffer = make_buffer(collection, on_written=cache.advance_epoch)
+        buffer.queue_favorite("u1", "a", add=True)
+        cache.modify("u1", lambda prefs: buffer.apply("u1", prefs))
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        # A read starts while the favorite is in flight and finds the old document
+        epoch = cache.epoch
+        stale = {"user_id": "u1", "favorites": []}
+        collection.release.set()
+        await flush
+        # The write has landed, so nothing is overlaid on the stale read anymore
+        assert buffer.apply("u1", stale) == stale
+        cache.load("u1", stale, epoch)
+        assert "u1" not in cache
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_requeues_under_newer_changes():
+    async def scenario():
+        collection = FakeCollection()
+        collection.release = asyncio.Event()
+        collection.fail = True
+        buffer = make_buffer(collection)
+        buffer.queue_replace("u1", {"user_id": "u1", "theme": "dark", "favorites": []})
+        buffer.queue_favorite("u2", "x", add=True)
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        buffer.queue_favorite("u1", "a", add=True)
+        buffer.queue_replace("u2", {"user_id": "u2", "theme": "light", "favorites": ["y"]})
+        collection.release.set()
+        with pytest.raises(ConnectionError):
+            await flush
+
+        assert len(buffer) == 2
+        assert buffer.apply("u1", None)["favorites"] == ["a"]
+        assert buffer.apply("u1", None)["theme"] == "dark"
+        # The newer full document wins over the older favorite toggle
+        assert buffer.apply("u2", None)["favorites"] == ["y"]
+
+        collection.fail = False
+        await buffer.flush()
+        return collection
+
+    collection = asyncio.run(scenario())
+    updates = {selector["user_id"]: update for selector, update, _ in describe(collection.batches[0])}
+    assert updates["u1"]["$set"]["favorites"] == ["a"]
+    assert updates["u2"]["$set"]["favorites"] == ["y"]
+
+
+def test_buffer_refuses_new_users_when_full():
+    async def scenario():
+        buffer = make_buffer(FakeCollection(), max_buffered=2)
+        buffer.queue_favorite("u1", "a", add=True)
+        buffer.queue_favorite("u2", "a", add=True)
+        with pytest.raises(BufferFull):
+            buffer.queue_favorite("u3", "a", add=True)
+        # Users that already have pending changes can keep changing them
+        buffer.queue_favorite("u1", "b", add=True)
+        assert len(buffer) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_size_triggered_flush_is_reported(capsys):
+    async def scenario():
+        collection = FakeCollection()
+        collection.fail = True
+        buffer = make_buffer(collection, max_pending=1)
+        buffer.queue_favorite("u1", "a", add=True)
+        await asyncio.sleep(0.01)
+        assert len(buffer) == 1
+
+    asyncio.run(scenario())
+    assert "Preference flush error: database down" in capsys.readouterr().out
@@ -0,0 +1,222 @@
+"""Write-behind buffer for user preference updates"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+# Fields a favorites-only upsert fills in when it creates the document
+PREFERENCE_DEFAULTS = {"has_seen_intro": False, "theme": "light"}
+
+
+class BufferFull(Exception):
+    """Raised when too many users have unwritten changes, e.g. while MongoDB is down"""
+
+
+class PendingPreferences:
+    """Coalesced, not yet persisted changes for one user.
+
+    Either a full replacement document from a PUT (``document``), with later
+    favorite toggles applied to it directly, or a set of favorite additions
+    and removals to be applied to whatever is stored.
+    """
+
+    def __init__(self):
+        self.document: Optional[dict] = None
+        self.added: Dict[str, None] = {}
+        self.removed: Dict[str, None] = {}
+
+    def replace(self, document: dict):
+        self.document = dict(document, favorites=list(document.get("favorites", [])))
+        self.added.clear()
+        self.removed.clear()
+
+    def favorite(self, faq_id: str, add: bool):
+        if self.document is not None:
+            favorites = self.document["favorites"]
+            if add and faq_id not in favorites:
+                favorites.append(faq_id)
+            elif not add and faq_id in favorites:
+                favorites.remove(faq_id)
+            self.document["updated_at"] = datetime.now()
+        elif add:
+            self.removed.pop(faq_id, None)
+            self.added[faq_id] = None
+        else:
+            self.added.pop(faq_id, None)
+            self.removed[faq_id] = None
+
+    def merge_newer(self, newer: "PendingPreferences"):
+        """Fold changes that were queued after this entry into it"""
+        if newer.document is not None:
+            self.replace(newer.document)
+            return
+        for faq_id in newer.added:
+            self.favorite(faq_id, True)
+        for faq_id in newer.removed:
+            self.favorite(faq_id, False)
+
+    def apply(self, stored: Optional[dict]) -> Optional[dict]:
+        """Return ``stored`` as it will look once these changes are written"""
+        if self.document is not None:
+            return dict(self.document, favorites=list(self.document["favorites"]))
+        if stored is None and not self.added:
+            return None
+        result = dict(stored) if stored is not None else dict(PREFERENCE_DEFAULTS)
+        favorites = [f for f in result.get("favorites", []) if f not in self.removed]
+        favorites += [f for f in self.added if f not in favorites]
+        result["favorites"] = favorites
+        return result
+
+    def operations(self, user_id: str) -> List[UpdateOne]:
+        now = datetime.now()
+        selector = {"user_id": user_id}
+        if self.document is not None:
+            return [UpdateOne(selector, {"$set": self.document}, upsert=True)]
+        operations = []
+        if self.added:
+            operations.append(UpdateOne(selector, {
+                "$addToSet": {"favorites": {"$each": list(self.added)}},
+                "$set": {"updated_at": now},
+                "$setOnInsert": dict(PREFERENCE_DEFAULTS, created_at=now),
+            }, upsert=True))
+        if self.removed:
+            operations.append(UpdateOne(selector, {
+                "$pull": {"favorites": {"$in": list(self.removed)}},
+                "$set": {"updated_at": now},
+            }))
+        return operations
+
+
+class PreferencesWriteBuffer:
+    """Coalesces preference writes per user and flushes them in one bulk write.
+
+    Writes are flushed every ``flush_interval`` seconds, as soon as
+    ``max_pending`` users have pending changes, and on shutdown. Changes
+    stay visible through ``apply()`` until the bulk write has finished, so
+    readers always see their own writes. While writes keep failing, at
+    most ``max_buffered`` users can have pending changes; changes for
+    further users are refused with ``BufferFull``. ``on_written`` is called
+    after each successful bulk write, before its changes stop being
+    overlaid, so caches can discard reads that started before it.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[UpdateOne]], Awaitable[None]],
+        max_pending: int = 100,
+        flush_interval: float = 0.5,
+        max_buffered: int = 10000,
+        on_written: Optional[Callable[[], None]] = None,
+    ):
+        self.write = write
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.on_written = on_written
+        self._pending: Dict[str, PendingPreferences] = {}
+        self._inflight: Dict[str, PendingPreferences] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _entry(self, user_id: str) -> PendingPreferences:
+        entry = self._pending.get(user_id)
+        if entry is None:
+            if len(self._pending) >= self.max_buffered:
+                raise BufferFull(f"{len(self._pending)} users have unwritten preference changes")
+            entry = self._pending[user_id] = PendingPreferences()
+        return entry
+
+    def queue_replace(self, user_id: str, document: dict):
+        """Queue a full preferences document (PUT semantics)"""
+        self._entry(user_id).replace(document)
+        self._maybe_flush()
+
+    def queue_favorite(self, user_id: str, faq_id: str, add: bool):
+        """Queue adding or removing one favorite"""
+        self._entry(user_id).favorite(faq_id, add)
+        self._maybe_flush()
+
+    def has_document(self, user_id: str) -> bool:
+        """Whether a full document is queued, making a database read unnecessary"""
+        for entries in (self._pending, self._inflight):
+            entry = entries.get(user_id)
+            if entry is not None and entry.document is not None:
+                return True
+        return False
+
+    def apply(self, user_id: str, stored: Optional[dict]) -> Optional[dict]:
+        """Overlay in-flight and pending changes on the stored document"""
+        for entries in (self._inflight, self._pending):
+            entry = entries.get(user_id)
+            if entry is not None:
+                stored = entry.apply(stored)
+        return stored
+
+    def _maybe_flush(self):
+        if len(self._pending) >= self.max_pending and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.create_task(self.flush())
+            self._size_flush.add_done_callback(self._report_flush_error)
+
+    @staticmethod
+    def _report_flush_error(task: asyncio.Task):
+        # Failed batches are already queued again; the error only needs reporting
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Preference flush error: {task.exception()}")
+
+    async def flush(self):
+        """Write all pending changes with a single bulk write"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._inflight, self._pending = self._pending, {}
+            operations = [
+                operation
+                for user_id, entry in self._inflight.items()
+                for operation in entry.operations(user_id)
+            ]
+            try:
+                if operations:
+                    await self.write(operations)
+                    if self.on_written is not None:
+                        self.on_written()
+            except Exception:
+                # Put the batch back underneath anything queued meanwhile
+                for user_id, newer in self._pending.items():
+                    older = self._inflight.get(user_id)
+                    if older is None:
+                        self._inflight[user_id] = newer
+                    else:
+                        older.merge_newer(newer)
+                self._pending = self._inflight
+                raise
+            finally:
+                self._inflight = {}
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Preference flush error: {e}")
+
+    def start(self):
+        """Start the periodic flush task"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop periodic flushing and write whatever is still pending"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()